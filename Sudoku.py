@@ -1,231 +1,796 @@
-import numpy as np
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import tkinter as tk
+import argparse
+import concurrent.futures
+import copy
+import multiprocessing
 import numpy
-import random
+import pickle
+import sys
 import time
-random.seed()
-Nd = 9
+
+import kernels
+import puzzles
+
+
+class Board(object):
+    """ The geometry of a Sudoku grid made up of box x box blocks, i.e. an Nd x Nd grid with Nd = box*box (9x9 for box = 3, 16x16 for box = 4, 25x25 for box = 5).
+
+    The index tables are computed once per box size: rows, columns and blocks give, for each cell, the index of the unit that it belongs to, and block_cells lists the (row, column) coordinates of the cells in each block.
+    """
+
+    _boards = {}  # Cache of the boards created so far, keyed by box size.
+
+    def __init__(self, box):
+        self.box = box
+        self.Nd = box*box
+        self.rows, self.columns = numpy.indices((self.Nd, self.Nd))
+        self.blocks = (self.rows // box) * box + (self.columns // box)
+
+        order = numpy.argsort(self.blocks, axis=None, kind="stable")
+        self.block_cells = numpy.stack(numpy.unravel_index(order, (self.Nd, self.Nd)), axis=-1).reshape(self.Nd, self.Nd, 2)
+
+        # The flat (row*Nd + column) indices of the cells of every row, column and block, the three units of each cell, and the peers of each cell (the other cells that share a unit with it).
+        cells = numpy.arange(self.Nd*self.Nd).reshape(self.Nd, self.Nd)
+        self.units = cells.tolist() + cells.T.tolist() + order.reshape(self.Nd, self.Nd).tolist()
+        self.cell_units = [[] for c in range(0, self.Nd*self.Nd)]
+        self.peers = [[] for c in range(0, self.Nd*self.Nd)]
+        for c in range(0, self.Nd*self.Nd):
+            i, j = divmod(c, self.Nd)
+            self.cell_units[c] = [self.units[i], self.units[self.Nd + j], self.units[2*self.Nd + self.blocks[i][j]]]
+            shared = set(self.units[i]) | set(self.units[self.Nd + j]) | set(self.units[2*self.Nd + self.blocks[i][j]])
+            self.peers[c] = sorted(shared - {c})
+        return
+
+    @staticmethod
+    def of_box(box):
+        """ Get the (shared) board for a given box size. """
+        if (box not in Board._boards):
+            Board._boards[box] = Board(box)
+        return Board._boards[box]
+
+    @staticmethod
+    def of_size(Nd):
+        """ Get the (shared) board for an Nd x Nd grid. """
+        box = int(round(Nd ** 0.5))
+        if (box*box != Nd):
+            raise ValueError("A %d x %d grid cannot be divided into square blocks." % (Nd, Nd))
+        return Board.of_box(box)
+
+
+def unit_counts(values, units):
+    """ Count the occurrences of each number in every unit (row, column or block) of a batch of grids.
+
+    values has shape (Nc, Nd, Nd) and holds numbers in [1, Nd]; units is one of the index tables of a Board. The result has shape (Nc, Nd, Nd), indexed by candidate, unit and number-1.
+    """
+    Nc, Nd = values.shape[0], values.shape[1]
+    offsets = numpy.arange(Nc).reshape(Nc, 1, 1) * Nd + units
+    index = offsets * Nd + (values - 1)
+    return numpy.bincount(index.ravel(), minlength=Nc*Nd*Nd).reshape(Nc, Nd, Nd)
+
+
+def unit_sums(counts):
+    """ Sum (1/len(set(count)))/Nd over the units of each candidate, i.e. the row_sum, column_sum or block_sum of the original scalar fitness. """
+    Nd = counts.shape[-1]
+    ordered = numpy.sort(counts, axis=-1)
+    distinct = 1 + numpy.count_nonzero(ordered[..., 1:] != ordered[..., :-1], axis=-1)
+    terms = (1.0/distinct)/Nd
+
+    # Accumulate unit by unit so that the floating point result is identical to the scalar version.
+    total = numpy.zeros(counts.shape[0])
+    for u in range(0, Nd):
+        total += terms[:, u]
+    return total
+
+
+def evaluate_fitness(values, counts=False):
+    """ Compute the fitness of a whole batch of candidates of shape (Nc, Nd, Nd) in one pass, returning a vector of Nc fitness values. If counts is True, the (Nc, Nd, Nd) column and block counts (see unit_counts) are returned as well.
+
+    This gives exactly the same values as the original per-candidate loops: column_sum * block_sum, or 1.0 if every row, column and block is free of duplicates.
+    """
+    values = numpy.asarray(values)
+    board = Board.of_size(values.shape[1])
+    column_counts = unit_counts(values, board.columns)
+    block_counts = unit_counts(values, board.blocks)
+    row_sum = unit_sums(unit_counts(values, board.rows))
+    column_sum = unit_sums(column_counts)
+    block_sum = unit_sums(block_counts)
+
+    solved = (numpy.floor(row_sum) == 1) & (numpy.floor(column_sum) == 1) & (numpy.floor(block_sum) == 1)
+    fitness = numpy.where(solved, 1.0, column_sum * block_sum)
+    if (counts):
+        return fitness, column_counts, block_counts
+    return fitness
+
+
+class UnitCounts(object):
+    """ The number of occurrences of each number in every column (or every block) of a single candidate, along with how many distinct counts each unit has, i.e. the len(set(count)) of the fitness.
+
+    When a cell changes, move() updates both in O(1) by keeping a histogram of the counts of each unit, so that the fitness can be updated after a swap or a crossover without rescanning the whole grid.
+    """
+
+    def __init__(self, counts, histogram=None, distinct=None):
+        self.counts = counts  # (Nd units, Nd numbers)
+        Nd = len(counts)
+        if (histogram is None):
+            histogram = numpy.zeros((Nd, Nd+1), dtype=counts.dtype)
+            for u in range(0, Nd):
+                histogram[u] = numpy.bincount(counts[u], minlength=Nd+1)
+        if (distinct is None):
+            distinct = numpy.count_nonzero(histogram, axis=1)
+        self.histogram = histogram  # (Nd units, Nd+1 possible counts)
+        self.distinct = distinct  # (Nd units)
+        return
+
+    @staticmethod
+    def histograms(counts):
+        """ Compute the histograms and numbers of distinct counts for a whole batch of (Nc, Nd, Nd) counts in one pass. """
+        return kernels.histograms(counts)
+
+    def copy(self):
+        return UnitCounts(numpy.copy(self.counts), numpy.copy(self.histogram), numpy.copy(self.distinct))
+
+    def move(self, unit, old, new):
+        """ Record that a cell of the unit changed from the number old to the number new. """
+        if (old != new):
+            self.change(unit, old-1, -1)
+            self.change(unit, new-1, 1)
+        return
+
+    def change(self, unit, index, delta):
+        histogram = self.histogram[unit]
+        count = int(self.counts[unit][index])
+        histogram[count] -= 1
+        if (histogram[count] == 0):
+            self.distinct[unit] -= 1
+        count += delta
+        self.counts[unit][index] = count
+        if (histogram[count] == 0):
+            self.distinct[unit] += 1
+        histogram[count] += 1
+        return
+
+    def sum(self):
+        """ The column_sum (or block_sum) of the fitness, accumulated in the same order as evaluate_fitness so that the result is identical. """
+        Nd = len(self.distinct)
+        total = 0.0
+        for distinct in self.distinct.tolist():
+            total += (1.0/distinct)/Nd
+        return total
+
+
+def popcount(mask):
+    """ The number of candidate values in a bitmask. """
+    return bin(mask).count("1")
+
+
+def mask_values(mask):
+    """ The values (bit d-1 stands for value d) in a bitmask, in increasing order. """
+    values = []
+    value = 1
+    while (mask):
+        if (mask & 1):
+            values.append(value)
+        mask >>= 1
+        value += 1
+    return values
+
+
+def match_row(domains, values, rng, choices=None):
+    """ Complete a partial assignment of values to the free cells of a row so that every cell gets a value of its domain (a list of bitmasks) and no value is used twice, i.e. find a perfect matching between the cells and the values. values is updated in place; a value of 0, or one outside the cell's domain or already used, counts as unassigned. choices are the values of each domain (see mask_values), if they are already known, e.g. from Given.cell_values.
+
+    The legal part of the partial assignment is kept, and the remaining cells are matched by augmenting paths, trying their values in a random order. Returns False if there is no perfect matching.
+    """
+    if (choices is None):
+        choices = [mask_values(mask) for mask in domains]
+    owner = {}  # The cell that each value is assigned to.
+    for cell, value in enumerate(values):
+        if (value > 0 and (domains[cell] >> (value - 1)) & 1 and value not in owner):
+            owner[value] = cell
+        else:
+            values[cell] = 0
+
+    def augment(cell, seen):
+        options = choices[cell]
+        for k in rng.permutation(len(options)):
+            value = options[k]
+            if (value not in seen):
+                seen.add(value)
+                if (value not in owner or augment(owner[value], seen)):
+                    owner[value] = cell
+                    values[cell] = value
+                    return True
+        return False
+
+    for cell in range(0, len(values)):
+        if (values[cell] == 0 and not augment(cell, set())):
+            return False
+    return True
+
+
+def repair_rows(rows, domains, rng, rounds):
+    """ Move a batch of rows towards legality in place. rows is an (M, n) array holding, for each of M rows, a permutation of the values of n free cells whose domains are the (n,) array of bitmasks.
+
+    Each round rotates the values of two (or, every other round, three) random cells of every illegal row along a cycle, starting from a cell whose value is outside its domain, in the rows where this does not increase the number of such cells, so that all the illegal rows take random walks towards legality at once. Returns the mask of the rows that are still illegal after the given number of rounds.
+    """
+    M, n = rows.shape
+    outside = ((domains >> (rows.astype(numpy.int64) - 1)) & 1) == 0  # The cells holding a value outside their domain.
+    active = numpy.flatnonzero(numpy.any(outside, axis=1))
+    for r in range(0, rounds):
+        if (n < 2 or len(active) == 0):
+            break
+        A = len(active)
+        length = 3 if n >= 3 and r % 2 == 1 else 2
+
+        # Draw length distinct cells in every illegal row, the first one among those holding a value outside their domain.
+        cells = numpy.empty((A, length), dtype=numpy.intp)
+        cells[:, 0] = numpy.argmax(rng.random((A, n)) * outside[active], axis=1)
+        second = rng.integers(n-1, size=A)
+        cells[:, 1] = second + (second >= cells[:, 0])
+        if (length == 3):
+            third = rng.integers(n-2, size=A)
+            third += (third >= numpy.minimum(cells[:, 0], cells[:, 1]))
+            third += (third >= numpy.maximum(cells[:, 0], cells[:, 1]))
+            cells[:, 2] = third
+
+        # Each cell takes the value of the one before it in the cycle, if that leaves no more values outside their domains.
+        lines = active[:, numpy.newaxis]
+        cell_domains = domains[cells]
+        moved = numpy.roll(rows[lines, cells], 1, axis=1)
+        fits = ((cell_domains >> (moved.astype(numpy.int64) - 1)) & 1) == 1
+        accepted = numpy.count_nonzero(fits, axis=1) >= length - numpy.count_nonzero(outside[lines, cells], axis=1)
+        lines = lines[accepted]
+        rows[lines, cells[accepted]] = moved[accepted]
+        outside[lines, cells[accepted]] = ~fits[accepted]
+        active = active[numpy.any(outside[active], axis=1)]
+    return numpy.any(outside, axis=1)
+
+
+def propagate(domains, board, pairs=True):
+    """ Constraint propagation over the candidate bitmasks of every cell (a flat list of Nd*Nd ints in which bit d-1 is set if the value d is still possible), updated in place.
+
+    Naked singles, hidden singles and, if pairs is True, naked and hidden pairs are applied until nothing changes any more. Returns False if a contradiction was found, i.e. a cell without any possible value or a value without any place in some unit, and True otherwise.
+    """
+    Nd = board.Nd
+    full = (1 << Nd) - 1
+    eliminated = [False] * (Nd*Nd)  # Singles that have already been removed from their peers.
+
+    changed = True
+    while (changed):
+        changed = False
+
+        # Naked singles: a cell with a single possible value rules that value out for all of its peers.
+        for cell in range(0, Nd*Nd):
+            mask = domains[cell]
+            if (mask == 0):
+                return False
+            if (not eliminated[cell] and mask & (mask - 1) == 0):
+                eliminated[cell] = True
+                for peer in board.peers[cell]:
+                    if (domains[peer] & mask):
+                        domains[peer] &= ~mask
+                        if (domains[peer] == 0):
+                            return False
+                        changed = True
+
+        # Hidden singles: a value that fits in only one cell of a unit must go there.
+        for unit in board.units:
+            once = 0
+            twice = 0
+            for cell in unit:
+                twice |= once & domains[cell]
+                once |= domains[cell]
+            if (once != full):
+                return False
+            singles = once & ~twice
+            if (singles):
+                for cell in unit:
+                    mask = domains[cell] & singles
+                    if (mask):
+                        if (mask & (mask - 1)):
+                            return False  # Two values that both have to go in this cell.
+                        if (domains[cell] != mask):
+                            domains[cell] = mask
+                            changed = True
+
+        if (changed or not pairs):
+            continue
+
+        for unit in board.units:
+            # Naked pairs: two cells of a unit with the same two possible values rule those values out for the rest of the unit.
+            seen = {}
+            for cell in unit:
+                mask = domains[cell]
+                if (popcount(mask) == 2):
+                    if (mask in seen):
+                        for other in unit:
+                            if (other != cell and other != seen[mask] and domains[other] & mask):
+                                domains[other] &= ~mask
+                                if (domains[other] == 0):
+                                    return False
+                                changed = True
+                    else:
+                        seen[mask] = cell
+
+            # Hidden pairs: two values that both fit in the same two cells of a unit only (and nowhere else) must take those two cells.
+            places = {}
+            for value in range(0, Nd):
+                bit = 1 << value
+                where = tuple(cell for cell in unit if domains[cell] & bit)
+                if (len(where) == 2):
+                    places.setdefault(where, []).append(bit)
+            for where, bits in places.items():
+                if (len(bits) == 2):
+                    mask = bits[0] | bits[1]
+                    for cell in where:
+                        if (domains[cell] != domains[cell] & mask):
+                            domains[cell] &= mask
+                            changed = True
+    return True
 
 
 class Candidate(object):
-    """ A candidate solutions to the Sudoku puzzle. """
+    """ A candidate solutions to the Sudoku puzzle.
 
-    def __init__(self):
-        self.values = numpy.zeros((Nd, Nd), dtype=int)
-        self.fitness = 0.0
+    Inside a Population, a candidate is only a lightweight view: its values and counts are slices of the population's arrays (see PopulationBuffer.view), so changing them changes the population.
+    """
+
+    __slots__ = ("values", "fitness", "board", "columns", "blocks")
+
+    def __init__(self, Nd=9, values=None, fitness=0.0, columns=None, blocks=None):
+        self.values = numpy.zeros((Nd, Nd), dtype=int) if values is None else values
+        self.fitness = fitness
+        self.board = Board.of_size(Nd)
+        self.columns = columns  # The UnitCounts of the columns and of the blocks, once the fitness has been computed.
+        self.blocks = blocks
         return
 
     def update_fitness(self):
-        """ The fitness of a candidate solution is determined by how close it is to being the actual solution to the puzzle. The actual solution (i.e. the 'fittest') is defined as a 9x9 grid of numbers in the range [1, 9] where each row, column and 3x3 block contains the numbers [1, 9] without any duplicates (see e.g. http://www.sudoku.com/); if there are any duplicates then the fitness will be lower. """
-
-        row_count = numpy.zeros(Nd)
-        column_count = numpy.zeros(Nd)
-        block_count = numpy.zeros(Nd)
-        row_sum = 0
-        column_sum = 0
-        block_sum = 0
-
-        for i in range(0, Nd):  # For each row...
-            for j in range(0, Nd):  # For each number within it...
-                # ...Update list with occurrence of a particular number.
-                row_count[self.values[i][j]-1] += 1
-
-            row_sum += (1.0/len(set(row_count)))/Nd
-            row_count = numpy.zeros(Nd)
-
-        for i in range(0, Nd):  # For each column...
-            for j in range(0, Nd):  # For each number within it...
-                # ...Update list with occurrence of a particular number.
-                column_count[self.values[j][i]-1] += 1
-
-            column_sum += (1.0 / len(set(column_count)))/Nd
-            column_count = numpy.zeros(Nd)
-
-        # For each block...
-        for i in range(0, Nd, 3):
-            for j in range(0, Nd, 3):
-                block_count[self.values[i][j]-1] += 1
-                block_count[self.values[i][j+1]-1] += 1
-                block_count[self.values[i][j+2]-1] += 1
-
-                block_count[self.values[i+1][j]-1] += 1
-                block_count[self.values[i+1][j+1]-1] += 1
-                block_count[self.values[i+1][j+2]-1] += 1
-
-                block_count[self.values[i+2][j]-1] += 1
-                block_count[self.values[i+2][j+1]-1] += 1
-                block_count[self.values[i+2][j+2]-1] += 1
-
-                block_sum += (1.0/len(set(block_count)))/Nd
-                block_count = numpy.zeros(Nd)
-
-        # Calculate overall fitness.
-        if (int(row_sum) == 1 and int(column_sum) == 1 and int(block_sum) == 1):
-            fitness = 1.0
+        """ The fitness of a candidate solution is determined by how close it is to being the actual solution to the puzzle. The actual solution (i.e. the 'fittest') is defined as an Nd x Nd grid (e.g. 9x9) of numbers in the range [1, Nd] where each row, column and block (e.g. 3x3) contains the numbers [1, Nd] without any duplicates (see e.g. http://www.sudoku.com/); if there are any duplicates then the fitness will be lower. """
+        fitness, column_counts, block_counts = evaluate_fitness(numpy.asarray(self.values)[numpy.newaxis], counts=True)
+        self.fitness = float(fitness[0])
+        self.columns = UnitCounts(column_counts[0])
+        self.blocks = UnitCounts(block_counts[0])
+        return
+
+    def refresh_fitness(self):
+        """ Recompute the fitness from the column and block counts alone, after the candidate was changed by swap(). Every row is a permutation of [1, Nd] (seeding, crossover and mutation all preserve this), so the row term is always 1 and is not recomputed. """
+        if (self.columns is None):
+            self.update_fitness()
+            return
+        column_sum = self.columns.sum()
+        block_sum = self.blocks.sum()
+        if (int(column_sum) == 1 and int(block_sum) == 1):
+            self.fitness = 1.0
         else:
-            fitness = column_sum * block_sum
+            self.fitness = column_sum * block_sum
+        return
 
-        self.fitness = fitness
+    def inherit(self, parent):
+        """ Take a copy of the genes of a parent, along with its column and block counts. """
+        self.values = numpy.copy(parent.values)
+        if (parent.columns is not None):
+            self.columns = parent.columns.copy()
+            self.blocks = parent.blocks.copy()
         return
 
-    def mutate(self, mutation_rate, given):
-        """ Mutate a candidate by picking a row, and then picking two values within that row to swap. """
+    def copy(self):
+        """ A copy of the candidate, including its fitness. """
+        candidate = Candidate(len(self.values))
+        candidate.inherit(self)
+        candidate.fitness = self.fitness
+        return candidate
+
+    def swap(self, row, column1, column2):
+        """ Swap two values of a row, updating the column and block counts of the (at most) two columns and two blocks affected. Call refresh_fitness() afterwards. """
+        value1 = self.values[row][column1]
+        value2 = self.values[row][column2]
+        self.values[row][column1] = value2
+        self.values[row][column2] = value1
+        if (self.columns is not None):
+            self.columns.move(column1, value1, value2)
+            self.columns.move(column2, value2, value1)
+            block1 = self.board.blocks[row][column1]
+            block2 = self.board.blocks[row][column2]
+            if (block1 != block2):
+                self.blocks.move(block1, value1, value2)
+                self.blocks.move(block2, value2, value1)
+        return
 
-        r = random.uniform(0, 1.1)
-        while (r > 1):  # Outside [0, 1] boundary - choose another
-            r = random.uniform(0, 1.1)
+    def local_search(self, given, steps, rng):
+        """ Min-conflicts hill climbing: up to the given number of times, pick a free cell whose value clashes with another one in its column or block, and swap it with the free cell of the same row that removes the most clashes (ties are broken at random). Only swaps that keep both values within their domains and strictly reduce the number of clashes are made, so the search stops early in a local minimum. Returns the number of swaps made; the fitness is refreshed afterwards. """
+        if (self.columns is None):
+            self.update_fitness()
+        Nd = given.Nd
+        blocks = self.board.blocks
+        columns = numpy.arange(Nd)
+        free = given.values == 0
+        moves = 0
+        for step in range(0, steps):
+            # Find the free cells that clash, i.e. whose value appears more than once in their column or block.
+            index = self.values.astype(numpy.intp) - 1
+            clashes = (self.columns.counts[columns, index] > 1) | (self.blocks.counts[blocks, index] > 1)
+            clashing = numpy.flatnonzero(clashes & free)
+            if (len(clashing) == 0):
+                break
+            row, column1 = divmod(int(clashing[rng.integers(len(clashing))]), Nd)
+            others = numpy.array(given.free_columns[row], dtype=numpy.intp)
+            others = others[others != column1]
+            if (len(others) == 0):
+                continue
+
+            # Keep the swaps that leave both values within their domains.
+            value1 = index[row, column1]
+            value2 = index[row, others]
+            legal = ((given.domains[row, others] >> value1) & 1).astype(bool) & ((given.domains[row, column1] >> value2) & 1).astype(bool)
+            others = others[legal]
+            value2 = value2[legal]
+            if (len(others) == 0):
+                continue
+
+            # The change in the number of clashes: a value leaving a unit removes a clash if it was duplicated there, and a value entering a unit adds one if it was already there.
+            delta = numpy.zeros(len(others), dtype=int)
+            for counts, unit1, unit2 in ((self.columns.counts, column1, others), (self.blocks.counts, blocks[row, column1], blocks[row, others])):
+                moved = unit2 != unit1
+                delta += moved * (-(counts[unit1, value1] > 1).astype(int) + (counts[unit1, value2] >= 1)
+                                  - (counts[unit2, value2] > 1) + (counts[unit2, value1] >= 1))
+            best = delta.min()
+            if (best >= 0):
+                continue
+            choices = others[delta == best]
+            self.swap(row, column1, int(choices[rng.integers(len(choices))]))
+            moves += 1
+
+        self.refresh_fitness()
+        return moves
+
+
+class PopulationBuffer(object):
+    """ Preallocated arrays holding the genes, fitness and column/block counts (see UnitCounts) of Nc candidates, as a structure of arrays. Genes and counts never exceed 25, so they are stored as uint8. """
+
+    __slots__ = ("values", "fitness", "column_counts", "column_histogram", "column_distinct", "block_counts", "block_histogram", "block_distinct")
+
+    def __init__(self, Nc, Nd):
+        self.values = numpy.zeros((Nc, Nd, Nd), dtype=numpy.uint8)
+        self.fitness = numpy.zeros(Nc)
+        self.column_counts = numpy.zeros((Nc, Nd, Nd), dtype=numpy.uint8)
+        self.column_histogram = numpy.zeros((Nc, Nd, Nd+1), dtype=numpy.uint8)
+        self.column_distinct = numpy.zeros((Nc, Nd), dtype=numpy.uint8)
+        self.block_counts = numpy.zeros((Nc, Nd, Nd), dtype=numpy.uint8)
+        self.block_histogram = numpy.zeros((Nc, Nd, Nd+1), dtype=numpy.uint8)
+        self.block_distinct = numpy.zeros((Nc, Nd), dtype=numpy.uint8)
+        return
 
-        success = False
-        if (r < mutation_rate):  # Mutate.
-            while (not success):
-                row1 = random.randint(0, 8)
-                row2 = random.randint(0, 8)
-                row2 = row1
+    def view(self, k):
+        """ A Candidate whose values and counts are views of the k-th slot, and whose fitness is a copy of it. """
+        return Candidate(self.values.shape[1], self.values[k], float(self.fitness[k]),
+                         UnitCounts(self.column_counts[k], self.column_histogram[k], self.column_distinct[k]),
+                         UnitCounts(self.block_counts[k], self.block_histogram[k], self.block_distinct[k]))
+
+    def take(self, source, indices, start):
+        """ Copy the candidates at the given indices of another buffer into consecutive slots from start onwards. """
+        stop = start + len(indices)
+        for name in PopulationBuffer.__slots__:
+            numpy.take(getattr(source, name), indices, axis=0, out=getattr(self, name)[start:stop])
+        return
 
-                from_column = random.randint(0, 8)
-                to_column = random.randint(0, 8)
-                while (from_column == to_column):
-                    from_column = random.randint(0, 8)
-                    to_column = random.randint(0, 8)
+    def put(self, source, indices, slots):
+        """ Copy the candidates at the given indices of another buffer into the given slots. """
+        for name in PopulationBuffer.__slots__:
+            getattr(self, name)[slots] = getattr(source, name)[indices]
+        return
 
-                # Check if the two places are free...
-                if (given.values[row1][from_column] == 0 and given.values[row1][to_column] == 0):
-                    # ...and that we are not causing a duplicate in the rows' columns.
-                    if (not given.is_column_duplicate(to_column, self.values[row1][from_column])
-                       and not given.is_column_duplicate(from_column, self.values[row2][to_column])
-                       and not given.is_block_duplicate(row2, to_column, self.values[row1][from_column])
-                       and not given.is_block_duplicate(row1, from_column, self.values[row2][to_column])):
+    def move_cells(self, slots, rows, columns, new):
+        """ Set the cells (slots[k], rows[k], columns[k]) to the values new[k], updating the column and block counts of the candidates (see kernels.move_cells). A cell must not appear twice. """
+        kernels.move_cells(self.values, self.column_counts, self.column_histogram, self.column_distinct, self.block_counts, self.block_histogram, self.block_distinct,
+                           Board.of_size(self.values.shape[1]).blocks, slots, rows, columns, new)
+        return
 
-                        # Swap values.
-                        temp = self.values[row2][to_column]
-                        self.values[row2][to_column] = self.values[row1][from_column]
-                        self.values[row1][from_column] = temp
-                        success = True
+    def refresh_fitness(self, slots):
+        """ Recompute the fitness of the candidates in the given slots from their column and block counts, exactly as Candidate.refresh_fitness does (see kernels.unit_fitness). """
+        self.fitness[slots] = kernels.unit_fitness(self.column_distinct, self.block_distinct, slots)
+        return
 
-        return success
+    def swap_random(self, slots, table, rng, puzzles=None, tries=16):
+        """ Swap two free values within a row of each of the candidates in the given slots, such that neither of them becomes a duplicate of a given. The candidate in slots[k] belongs to the puzzle puzzles[k] of the SwapTable table (the first one if puzzles is None). The swaps are drawn uniformly from the swap pairs of each candidate's puzzle (see Given.swap_pairs), the only pairs of places whose values can ever trade places, so that most draws are legal: each candidate gets tries draws at once and keeps its first legal one. The few candidates left without one are then checked against all the pairs, and get one of their legal swaps at random if there is any. Returns the mask of the slots for which a legal swap was found, and the number of swaps tried (counting the draws up to the first legal one, and every pair checked for the others). Call refresh_fitness() afterwards. """
+        slots = numpy.asarray(slots, dtype=numpy.intp)
+        puzzles = numpy.zeros(len(slots), dtype=numpy.intp) if puzzles is None else numpy.asarray(puzzles, dtype=numpy.intp)
+        found = numpy.zeros(len(slots), dtype=bool)
+        chosen = numpy.zeros(len(slots), dtype=numpy.intp)
+        counts = table.counts[puzzles]
+        able = numpy.flatnonzero(counts > 0)  # The candidates whose puzzle has some pair to swap.
+        if (len(able) == 0):
+            return found, 0
+
+        # Draw a few pairs for every candidate, and check that both values are still legal in their new places.
+        drawn = rng.integers(counts[able][:, numpy.newaxis], size=(len(able), tries))
+        puzzle = puzzles[able][:, numpy.newaxis]
+        legal = self.legal_swaps(slots[able][:, numpy.newaxis], table.pairs[puzzle, drawn], table.domains, puzzle)
+        hit = numpy.any(legal, axis=1)
+        first = numpy.argmax(legal, axis=1)
+        chosen[able] = drawn[numpy.arange(len(able)), first]
+        found[able] = hit
+        attempts = int(numpy.sum(first[hit] + 1)) + tries*int(numpy.count_nonzero(~hit))  # The draws up to the first legal one.
+
+        # Look for the legal swaps of the candidates that have not found one among all the pairs.
+        missed = able[~hit]
+        if (len(missed) > 0):
+            P = int(numpy.max(counts[missed]))
+            puzzle = puzzles[missed][:, numpy.newaxis]
+            legal = self.legal_swaps(slots[missed][:, numpy.newaxis], table.pairs[puzzle, numpy.arange(P)], table.domains, puzzle)
+            legal &= numpy.arange(P) < counts[missed][:, numpy.newaxis]
+            legal_counts = numpy.count_nonzero(legal, axis=1)
+            picks = (rng.random(len(missed)) * legal_counts).astype(numpy.intp)
+            chosen[missed] = numpy.argmax(numpy.cumsum(legal, axis=1) > picks[:, numpy.newaxis], axis=1)
+            found[missed] = legal_counts > 0
+            attempts += int(numpy.sum(counts[missed]))
+
+        swapped = numpy.flatnonzero(found)
+        row, column1, column2 = table.pairs[puzzles[swapped], chosen[swapped]].T
+        slot = slots[swapped]
+        value1 = self.values[slot, row, column1]
+        value2 = self.values[slot, row, column2]
+        self.move_cells(numpy.concatenate((slot, slot)), numpy.concatenate((row, row)), numpy.concatenate((column1, column2)), numpy.concatenate((value2, value1)))
+        return found, attempts
+
+    def legal_swaps(self, slots, pairs, domains, puzzles):
+        """ Check, for the candidates in the given slots, whether swapping the values of the (row, column1, column2) pairs keeps both values within the domains of their new places, domains[puzzles] being the domains of each candidate's puzzle. slots, puzzles and the leading axes of pairs broadcast together. """
+        row, column1, column2 = pairs[..., 0], pairs[..., 1], pairs[..., 2]
+        value1 = self.values[slots, row, column1].astype(numpy.int64) - 1
+        value2 = self.values[slots, row, column2].astype(numpy.int64) - 1
+        return ((domains[puzzles, row, column2] >> value1) & (domains[puzzles, row, column1] >> value2) & 1) == 1
+
+    def store(self, k, candidate):
+        """ Copy a candidate into the k-th slot. """
+        if (candidate.columns is None):
+            candidate.update_fitness()
+        self.values[k] = candidate.values
+        self.fitness[k] = candidate.fitness
+        self.column_counts[k] = candidate.columns.counts
+        self.column_histogram[k] = candidate.columns.histogram
+        self.column_distinct[k] = candidate.columns.distinct
+        self.block_counts[k] = candidate.blocks.counts
+        self.block_histogram[k] = candidate.blocks.histogram
+        self.block_distinct[k] = candidate.blocks.distinct
+        return
+
+
+class SwapTable(object):
+    """ What mutation needs to know about count puzzles of size Nd to draw legal swaps (see PopulationBuffer.swap_random), stacked so that the candidates of several puzzles can be mutated at once: the domains of each puzzle, its swap pairs (see Given.swap_pairs) padded to the largest possible number, and how many it has. """
+
+    def __init__(self, count, Nd):
+        self.domains = numpy.zeros((count, Nd, Nd), dtype=numpy.int64)
+        self.pairs = numpy.zeros((count, Nd*(Nd*(Nd-1)//2), 3), dtype=numpy.intp)
+        self.counts = numpy.zeros(count, dtype=numpy.intp)
+        return
+
+    @staticmethod
+    def of(given):
+        """ The table of a single puzzle. """
+        table = SwapTable(1, given.Nd)
+        table.set(0, given)
+        return table
+
+    def set(self, k, given):
+        """ Put the tables of a puzzle in the k-th place. """
+        self.domains[k] = given.domains
+        self.counts[k] = len(given.swap_pairs)
+        self.pairs[k, 0:self.counts[k]] = given.swap_pairs
+        return
 
 
 class Population(object):
-    """ A set of candidate solutions to the Sudoku puzzle. These candidates are also known as the chromosomes in the population. """
+    """ A set of candidate solutions to the Sudoku puzzle. These candidates are also known as the chromosomes in the population.
+
+    The population is stored as a structure of arrays (see PopulationBuffer) rather than as a list of Candidate objects. It is double-buffered: the next generation is built in the spare buffer, and the two are then swapped, so that no memory is allocated from one generation to the next.
+    """
 
     def __init__(self):
-        self.candidates = []
-        return
-
-    def seed(self, Nc, given):
-        self.candidates = []
-
-        # Determine the legal values that each square can take.
-        helper = Candidate()
-        helper.values = [[[] for j in range(0, Nd)] for i in range(0, Nd)]
-        for row in range(0, Nd):
-            for column in range(0, Nd):
-                for value in range(1, 10):
-                    if ((given.values[row][column] == 0) and not (given.is_column_duplicate(column, value) or given.is_block_duplicate(row, column, value) or given.is_row_duplicate(row, value))):
-                        # Value is available.
-                        helper.values[row][column].append(value)
-                    elif (given.values[row][column] != 0):
-                        # Given/known value from file.
-                        helper.values[row][column].append(
-                            given.values[row][column])
-                        break
-
-        # Seed a new population.
-        for p in range(0, Nc):
-            g = Candidate()
-            for i in range(0, Nd):  # New row in candidate.
-                row = numpy.zeros(Nd)
-
-                # Fill in the givens.
-                for j in range(0, Nd):  # New column j value in row i.
-
-                    # If value is already given, don't change it.
-                    if (given.values[i][j] != 0):
-                        row[j] = given.values[i][j]
-                    # Fill in the gaps using the helper board.
-                    elif (given.values[i][j] == 0):
-                        row[j] = helper.values[i][j][random.randint(
-                            0, len(helper.values[i][j])-1)]
-
-                # If we don't have a valid board, then try again. There must be no duplicates in the row.
-                while (len(list(set(row))) != Nd):
-                    for j in range(0, Nd):
-                        if (given.values[i][j] == 0):
-                            row[j] = helper.values[i][j][random.randint(
-                                0, len(helper.values[i][j])-1)]
-
-                g.values[i] = row
-
-            self.candidates.append(g)
+        self.current = None
+        self.spare = None
+        return
+
+    @property
+    def Nc(self):
+        return 0 if self.current is None else len(self.current.fitness)
+
+    @property
+    def values(self):
+        return self.current.values
+
+    @property
+    def fitness(self):
+        return self.current.fitness
+
+    def allocate(self, Nc, Nd):
+        """ Make sure that both buffers can hold Nc candidates of size Nd. """
+        if (self.current is None or self.current.values.shape != (Nc, Nd, Nd)):
+            self.current = PopulationBuffer(Nc, Nd)
+            self.spare = PopulationBuffer(Nc, Nd)
+        return
+
+    def seed(self, Nc, given, rng=None, rounds=4):
+        """ Fill the population with Nc random candidates, drawing all random numbers from the numpy Generator rng.
+
+        Each row is built directly as a random permutation of the values missing from it, for all Nc candidates at once. Permutations that put a value outside the (possibly propagated) domain of its cell are drawn again, up to the given number of rounds. Any that are still illegal are then repaired, all at once by random moves towards legality (see repair_rows), and the few that are left by bipartite matching of the cells against their domains (see match_row), so that every row is always legal. Raises ValueError if some row cannot be completed at all.
+        """
+        if (rng is None):
+            rng = numpy.random.default_rng()
+        Nd = given.Nd
+        self.allocate(Nc, Nd)
+        values = self.current.values
+
+        # Fill in the givens.
+        values[:] = given.values
+
+        # Fill in the gaps with a random permutation of the missing values of each row.
+        for i in range(0, Nd):
+            free = numpy.array(given.free_columns[i], dtype=numpy.intp)
+            if (len(free) == 0):
+                continue
+            missing = numpy.setdiff1d(numpy.arange(1, Nd+1), given.values[i])
+            domains = given.domains[i, free]
+            rows = numpy.empty((Nc, len(free)), dtype=missing.dtype)
+            illegal = numpy.arange(Nc)
+            for r in range(0, rounds):
+                rows[illegal] = missing[numpy.argsort(rng.random((len(illegal), len(free))), axis=1)]
+                legal = numpy.all((domains >> (rows[illegal] - 1)) & 1, axis=1)
+                illegal = illegal[~legal]
+                if (len(illegal) == 0):
+                    break
+
+            # Repair the rows that are still illegal.
+            if (len(illegal) > 0):
+                repaired = rows[illegal]
+                left = numpy.flatnonzero(repair_rows(repaired, domains, rng, 4*len(free)))
+                cell_domains = domains.tolist()
+                choices = [given.cell_values[i][column] for column in free]
+                for p in left:
+                    row = repaired[p].tolist()
+                    if (not match_row(cell_domains, row, rng, choices)):
+                        raise ValueError("The puzzle has no solution: row %d cannot be completed." % i)
+                    repaired[p] = row
+                rows[illegal] = repaired
+            values[:, i, free] = rows
 
         # Compute the fitness of all candidates in the population.
         self.update_fitness()
 
-        print("Seeding complete.")
-
         return
 
     def update_fitness(self):
-        """ Update fitness of every candidate/chromosome. """
-        for candidate in self.candidates:
-            candidate.update_fitness()
+        """ Update fitness (and the column and block counts) of every candidate/chromosome in a single vectorized pass over the (Nc, Nd, Nd) array of the whole population. """
+        if (self.Nc == 0):
+            return
+        buffer = self.current
+        fitness, column_counts, block_counts = evaluate_fitness(buffer.values, counts=True)
+        buffer.fitness[:] = fitness
+        buffer.column_counts[:] = column_counts
+        buffer.block_counts[:] = block_counts
+        buffer.column_histogram[:], buffer.column_distinct[:] = UnitCounts.histograms(column_counts)
+        buffer.block_histogram[:], buffer.block_distinct[:] = UnitCounts.histograms(block_counts)
         return
 
-    def sort(self):
-        """ Sort the population based on fitness. """
-        self.candidates.sort(key=lambda x: x.fitness, reverse=True)
+    def swap(self):
+        """ Make the spare buffer, which holds the next generation, the current one. """
+        self.current, self.spare = self.spare, self.current
         return
 
-    def sort_fitness(self, x, y):
-        """ The sorting function. """
-        if (x.fitness < y.fitness):
-            return 1
-        elif (x.fitness == y.fitness):
-            return 0
-        else:
-            return -1
+    def top(self, count):
+        """ The indices of the given number of fittest candidates, in no particular order. This only partitions the fitness vector (argpartition), which is O(Nc) rather than the O(Nc log Nc) of a full sort. """
+        fitness = self.current.fitness
+        if (count <= 0):
+            return numpy.empty(0, dtype=numpy.intp)
+        if (count >= len(fitness)):
+            return numpy.arange(len(fitness))
+        return numpy.argpartition(-fitness, count-1)[:count]
+
+    def bottom(self, count):
+        """ The indices of the given number of weakest candidates, the weakest first. """
+        fitness = self.current.fitness
+        if (count <= 0):
+            return numpy.empty(0, dtype=numpy.intp)
+        weakest = numpy.arange(len(fitness)) if count >= len(fitness) else numpy.argpartition(fitness, count-1)[:count]
+        return weakest[numpy.argsort(fitness[weakest], kind="stable")]
+
+    def diversity(self):
+        """ The fraction of the candidates that are distinct. Candidates are compared by a hash of their values (a weighted sum with fixed pseudo-random weights), which is much cheaper than comparing them row by row. """
+        Nc = self.Nc
+        if (Nc == 0):
+            return 0.0
+        cells = self.current.values[0].size
+        weights = numpy.random.default_rng(cells).integers(1, 1 << 40, size=cells)
+        hashes = numpy.reshape(self.current.values, (Nc, -1)).astype(numpy.int64) @ weights
+        return len(numpy.unique(hashes))/Nc
+
+    def leaders(self):
+        """ The fitness of the two fittest candidates, the fittest first. """
+        fitness = self.current.fitness
+        top = numpy.partition(fitness, len(fitness)-2)[len(fitness)-2:]
+        return top[1], top[0]
+
+    def fittest(self, count):
+        """ Copies of the given number of fittest candidates, the fittest first. """
+        top = self.top(count)
+        top = top[numpy.argsort(-self.current.fitness[top], kind="stable")]
+        return [self.current.view(k).copy() for k in top]
 
 
 class Given(Candidate):
-    """ The grid containing the given/known values. """
+    """ The grid containing the given/known values. Empty cells hold 0. The box size defaults to the square root of the grid size.
+
+    The domains are bitmasks of the values that each cell can still take (bit d-1 for the value d). Unless they are passed in, they are found by ruling out the given values of each cell's row, column and block.
+
+    Everything the inner loops of seeding, mutation and local search need is precomputed once here: the bitmasks of the given values of every row, column and block (so that duplicate checks are single bit tests), the free places of every row, the values each cell can take, and the pairs of free places that mutation can swap.
+    """
 
-    def __init__(self, values):
-        self.values = values
+    def __init__(self, values, box=None, domains=None):
+        self.values = numpy.array(values, dtype=int)
+        self.Nd = len(self.values)
+        self.board = Board.of_size(self.Nd) if box is None else Board.of_box(box)
+        if (self.values.shape != (self.board.Nd, self.board.Nd)):
+            raise ValueError("Expected a %d x %d grid for box size %d, got shape %s." % (self.board.Nd, self.board.Nd, self.board.box, self.values.shape))
+
+        # Bitmasks of the given values in each row, column and block.
+        bits = numpy.where(self.values > 0, numpy.left_shift(1, self.values - 1), 0).astype(numpy.int64)
+        self.row_bits = numpy.bitwise_or.reduce(bits, axis=1)
+        self.column_bits = numpy.bitwise_or.reduce(bits, axis=0)
+        self.block_bits = numpy.zeros(self.Nd, dtype=numpy.int64)
+        numpy.bitwise_or.at(self.block_bits, self.board.blocks.ravel(), bits.ravel())
+
+        if (domains is None):
+            taken = self.row_bits[:, numpy.newaxis] | self.column_bits[numpy.newaxis, :] | self.block_bits[self.board.blocks]
+            domains = numpy.where(self.values > 0, bits, ((1 << self.Nd) - 1) & ~taken)
+        self.domains = numpy.array(domains, dtype=numpy.int64)
+
+        # The free (non-given) places of each row, and the rows that have at least two of them (i.e. that can be mutated).
+        self.free_columns = [list(numpy.flatnonzero(self.values[row] == 0)) for row in range(0, self.Nd)]
+        self.swappable_rows = [row for row in range(0, self.Nd) if len(self.free_columns[row]) >= 2]
+
+        # The values that each cell can take.
+        self.cell_values = [[mask_values(int(self.domains[row][column])) for column in range(0, self.Nd)] for row in range(0, self.Nd)]
+
+        # The (row, column1, column2) pairs of free places of the same row that mutation can swap, i.e. whose domains share at least two values: the two values of a legal row are each within their own cell's domain, so they can only trade places if both fit in both cells.
+        pairs = []
+        for row in self.swappable_rows:
+            free = numpy.array(self.free_columns[row], dtype=numpy.intp)
+            first, second = numpy.triu_indices(len(free), 1)
+            shared = self.domains[row, free[first]] & self.domains[row, free[second]]
+            swappable = (shared & (shared - 1)) != 0
+            pairs.append(numpy.stack((numpy.full(numpy.count_nonzero(swappable), row), free[first[swappable]], free[second[swappable]]), axis=1))
+        self.swap_pairs = numpy.concatenate(pairs) if len(pairs) > 0 else numpy.zeros((0, 3), dtype=numpy.intp)
         return
 
+    def is_solved(self):
+        """ Check whether every cell has a given value. """
+        return bool(numpy.all(self.values != 0))
+
+    def accepts(self, candidate):
+        """ Check whether a candidate is a solution of this puzzle, i.e. whether it keeps all the given values and has no duplicates in any row, column or block. """
+        values = numpy.asarray(candidate.values)
+        if (values.shape != self.values.shape or numpy.any((self.values != 0) & (values != self.values))):
+            return False
+        if (numpy.any(values < 1) or numpy.any(values > self.Nd)):
+            return False
+        return bool(evaluate_fitness(values[numpy.newaxis])[0] == 1.0)
+
+    def propagate(self, pairs=True):
+        """ Run constraint propagation (see propagate) on the domains, returning a new Given in which every cell that was forced to a single value is promoted to a given value. Raises ValueError if the puzzle turns out to have no solution. """
+        domains = self.domains.ravel().tolist()
+        if (not propagate(domains, self.board, pairs)):
+            raise ValueError("The puzzle has no solution.")
+        values = [mask.bit_length() if mask & (mask - 1) == 0 else 0 for mask in domains]
+        return Given(numpy.reshape(values, (self.Nd, self.Nd)), self.board.box, numpy.reshape(domains, (self.Nd, self.Nd)))
+
     def is_row_duplicate(self, row, value):
         """ Check whether there is a duplicate of a fixed/given value in a row. """
-        for column in range(0, Nd):
-            if (self.values[row][column] == value):
-                return True
-        return False
+        return bool((self.row_bits[row] >> (value - 1)) & 1)
 
     def is_column_duplicate(self, column, value):
         """ Check whether there is a duplicate of a fixed/given value in a column. """
-        for row in range(0, Nd):
-            if (self.values[row][column] == value):
-                return True
-        return False
+        return bool((self.column_bits[column] >> (value - 1)) & 1)
 
     def is_block_duplicate(self, row, column, value):
-        """ Check whether there is a duplicate of a fixed/given value in a 3 x 3 block. """
-        i = 3*(int(row/3))
-        j = 3*(int(column/3))
-
-        if ((self.values[i][j] == value)
-           or (self.values[i][j+1] == value)
-           or (self.values[i][j+2] == value)
-           or (self.values[i+1][j] == value)
-           or (self.values[i+1][j+1] == value)
-           or (self.values[i+1][j+2] == value)
-           or (self.values[i+2][j] == value)
-           or (self.values[i+2][j+1] == value)
-           or (self.values[i+2][j+2] == value)):
-            return True
-        else:
-            return False
+        """ Check whether there is a duplicate of a fixed/given value in the block containing (row, column). """
+        return bool((self.block_bits[self.board.blocks[row][column]] >> (value - 1)) & 1)
 
 
 class Tournament(object):
@@ -234,208 +799,912 @@ class Tournament(object):
     Two individuals are selected from the population pool and a random number in [0, 1] is chosen. If this number is less than the 'selection rate' (e.g. 0.85), then the fitter individual is selected; otherwise, the weaker one is selected.
     """
 
-    def __init__(self):
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else numpy.random.default_rng()
         return
 
-    def compete(self, candidates):
-        """ Pick 2 random candidates from the population and get them to compete against each other. """
-        c1 = candidates[random.randint(0, len(candidates)-1)]
-        c2 = candidates[random.randint(0, len(candidates)-1)]
-        f1 = c1.fitness
-        f2 = c2.fitness
+    def select(self, fitness, count):
+        """ Run count tournaments at once, drawing all the pairs of candidates and all the random numbers in a single call each. Returns the array of the indices of the winners.
+
+        fitness can also be an (A, Nc) array holding the fitness of A populations (e.g. those of the puzzles of multipuzzle.MultiPuzzleGA), in which case count tournaments are run within each population and the (A, count) indices of the winners are those within their population.
+        """
+        fitness = numpy.asarray(fitness)
+        pairs = self.rng.integers(fitness.shape[-1], size=fitness.shape[:-1] + (count, 2))
+        c1 = pairs[..., 0]
+        c2 = pairs[..., 1]
 
         # Find the fittest and the weakest.
-        if (f1 > f2):
-            fittest = c1
-            weakest = c2
-        else:
-            fittest = c2
-            weakest = c1
+        first = numpy.take_along_axis(fitness, c1, axis=-1) > numpy.take_along_axis(fitness, c2, axis=-1)
+        fittest = numpy.where(first, c1, c2)
+        weakest = numpy.where(first, c2, c1)
 
         selection_rate = 0.85
-        r = random.uniform(0, 1.1)
-        while (r > 1):  # Outside [0, 1] boundary. Choose another.
-            r = random.uniform(0, 1.1)
-        if (r < selection_rate):
-            return fittest
-        else:
-            return weakest
+        r = self.rng.random(fitness.shape[:-1] + (count,))
+        return numpy.where(r < selection_rate, fittest, weakest)
 
 
 class CycleCrossover(object):
     """ Crossover relates to the analogy of genes within each parent candidate mixing together in the hopes of creating a fitter child candidate."""
 
-    def __init__(self):
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else numpy.random.default_rng()
         return
 
-    def crossover(self, parent1, parent2, crossover_rate):
-        """ Create two new child candidates by crossing over parent genes. """
-        child1 = Candidate()
-        child2 = Candidate()
-
-        # Make a copy of the parent genes.
-        child1.values = numpy.copy(parent1.values)
-        child2.values = numpy.copy(parent2.values)
-
-        r = random.uniform(0, 1.1)
-        while (r > 1):  # Outside [0, 1] boundary. Choose another.
-            r = random.uniform(0, 1.1)
-
-        # Perform crossover.
-        if (r < crossover_rate):
-            # Pick a crossover point. Crossover must have at least 1 row (and at most Nd-1) rows.
-            crossover_point1 = random.randint(0, 8)
-            crossover_point2 = random.randint(1, 9)
-            while (crossover_point1 == crossover_point2):
-                crossover_point1 = random.randint(0, 8)
-                crossover_point2 = random.randint(1, 9)
-
-            if (crossover_point1 > crossover_point2):
-                temp = crossover_point1
-                crossover_point1 = crossover_point2
-                crossover_point2 = temp
-
-            for i in range(crossover_point1, crossover_point2):
-                child1.values[i], child2.values[i] = self.crossover_rows(
-                    child1.values[i], child2.values[i])
-
-        return child1, child2
-
-    def crossover_rows(self, row1, row2):
-        child_row1 = numpy.zeros(Nd)
-        child_row2 = numpy.zeros(Nd)
-
-        remaining = list(range(1, Nd+1))
-        cycle = 0
-
-        while (numpy.any(child_row1 == 0) and numpy.any(child_row2 == 0)):
-            if (cycle % 2 == 0):  # Even cycles.
-                # Assign next unused value.
-                index = self.find_unused(row1, remaining)
-                start = row1[index]
-                remaining.remove(row1[index])
-                child_row1[index] = row1[index]
-                child_row2[index] = row2[index]
-                next = row2[index]
-
-                while (next != start):  # While cycle not done...
-                    index = self.find_value(row1, next)
-                    child_row1[index] = row1[index]
-                    remaining.remove(row1[index])
-                    child_row2[index] = row2[index]
-                    next = row2[index]
-
-                cycle += 1
-
-            else:  # Odd cycle - flip values.
-                index = self.find_unused(row1, remaining)
-                start = row1[index]
-                remaining.remove(row1[index])
-                child_row1[index] = row2[index]
-                child_row2[index] = row1[index]
-                next = row2[index]
-
-                while (next != start):  # While cycle not done...
-                    index = self.find_value(row1, next)
-                    child_row1[index] = row2[index]
-                    remaining.remove(row1[index])
-                    child_row2[index] = row1[index]
-                    next = row2[index]
-
-                cycle += 1
-
-        return child_row1, child_row2
-
-    def find_unused(self, parent_row, remaining):
-        for i in range(0, len(parent_row)):
-            if (parent_row[i] in remaining):
-                return i
-
-    def find_value(self, parent_row, value):
-        for i in range(0, len(parent_row)):
-            if (parent_row[i] == value):
-                return i
-
-
-class GeneticAlgorithmViewer:
-    def __init__(self):
-        self.root = tk.Tk()
-        self.root.title("Sudoku Solving using Genetic Algorithm")
-
-        # Add a frame to add padding
-        self.frame = tk.Frame(self.root, padx=10, pady=10)
-        self.frame.grid(row=0, column=0, pady=10, padx=10)
-
-        self.generation_label = tk.Label(
-            self.root, text="Generation", font=('Inter', 14, 'bold'))
-        self.generation_label.grid(row=11, column=0, columnspan=30, pady=0)
-
-        self.fitness_label = tk.Label(
-            self.root, text="Fitness", font=('Inter', 14, 'bold'))
-        self.fitness_label.grid(row=12, column=0, columnspan=30, pady=0)
-
-        self.seeding_label = tk.Label(
-            self.root, text="Seeding Complete.", font=('Inter', 14, 'bold'), fg='green')
-        self.seeding_label.grid(row=13, column=0, columnspan=30, pady=0)
-
-        self.solution_label = tk.Label(
-            self.root, text="", font=('Inter', 14, 'bold'), fg='green')
-        self.solution_label.grid(row=14, column=0, columnspan=30, pady=0)
-
-        self.time_label = tk.Label(
-            self.root, text="", font=('Inter', 14, 'bold'), fg='green')
-        self.time_label.grid(row=15, column=0, columnspan=30, pady=0, padx=10)
-
-        # Create a Matplotlib figure and canvas to embed it in the Tkinter window
-        self.fig = Figure(figsize=(5, 4), dpi=100)
-        self.ax = self.fig.add_subplot(111)
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
-        self.canvas_widget = self.canvas.get_tk_widget()
-        self.canvas_widget.grid(row=10, column=0, columnspan=30, pady=10)
-
-        # Create labels for displaying the matrix
-        self.matrix_labels = []
-
-    def update_matplotlib_figure(self, generations, fitness_values):
-        if generations is None or fitness_values is None:
-            # Replace this with your dynamic data update logic
-            x = np.linspace(0, 10, 100)
-            y = np.sin(x)
+    def crossover_points(self, Nd, count):
+        """ Draw count pairs of crossover points at once, as an array of (point1, point2) rows with point1 < point2. Crossover must have at least 1 row (and at most Nd-1) rows. """
+        points = numpy.empty((count, 2), dtype=int)
+        points[:, 0] = self.rng.integers(0, Nd, size=count)
+        points[:, 1] = self.rng.integers(1, Nd+1, size=count)
+        same = numpy.flatnonzero(points[:, 0] == points[:, 1])
+        while (len(same) > 0):  # Choose again where the two points are the same.
+            points[same, 0] = self.rng.integers(0, Nd, size=len(same))
+            points[same, 1] = self.rng.integers(1, Nd+1, size=len(same))
+            same = same[points[same, 0] == points[same, 1]]
+        points.sort(axis=1)
+        return points
+
+    @staticmethod
+    def odd_cycles(rows1, rows2):
+        """ Find the cycles of a batch of (M, Nd) pairs of rows (each a permutation of [1, Nd]) for cycle crossover, returning an (M, Nd) mask of the places that belong to odd cycles.
+
+        A cycle starts at a place i, goes on to the place in rows1 of the value rows2[i], and so on until it gets back to i. The cycles are numbered in the order of their first place; children keep the values of their own parent in even cycles and take those of the other parent in odd ones. See kernels.odd_cycles.
+        """
+        return kernels.odd_cycles(rows1, rows2)
+
+    def cross_batch(self, buffer, children1, children2, points):
+        """ Cross over many pairs of children (copies of their parents) held in a PopulationBuffer in one pass, child children1[p] with child children2[p] over the rows [points[p][0], points[p][1]).
+
+        The rows of all the pairs are crossed together (see odd_cycles), and the cells that change are written straight into the buffer along with the column and block counts of the children (see kernels.move_cells). Call refresh_fitness() on the children afterwards.
+        """
+        children1 = numpy.asarray(children1, dtype=numpy.intp)
+        children2 = numpy.asarray(children2, dtype=numpy.intp)
+        if (len(children1) == 0):
+            return
+        Nd = buffer.values.shape[1]
+
+        # The (pair, row) of every row that is crossed over.
+        rows = numpy.arange(Nd)
+        crossed = (rows >= points[:, 0:1]) & (rows < points[:, 1:2])
+        pair, row = numpy.nonzero(crossed)
+        child1 = children1[pair]
+        child2 = children2[pair]
+        rows1 = buffer.values[child1, row]
+        rows2 = buffer.values[child2, row]
+
+        # Only odd cycles change the children, and only where the two parents differ: there, each child takes the value of the other.
+        flip = CycleCrossover.odd_cycles(rows1, rows2) & (rows1 != rows2)
+        line, column = numpy.nonzero(flip)
+        cell_row = row[line]
+        buffer.move_cells(numpy.concatenate((child1[line], child2[line])), numpy.concatenate((cell_row, cell_row)), numpy.concatenate((column, column)),
+                          numpy.concatenate((rows2[line, column], rows1[line, column])))
+        return
+
+
+def luby(i):
+    """ The i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ..., the restart schedule that is optimal up to a constant factor when nothing is known about the distribution of run times. """
+    k = 1
+    while ((1 << k) - 1 < i):
+        k += 1
+    while ((1 << k) - 1 != i):
+        i -= (1 << (k-1)) - 1
+        k = 1
+        while ((1 << k) - 1 < i):
+            k += 1
+    return 1 << (k-1)
+
+
+class RestartPolicy(object):
+    """ Decides when the population of the genetic algorithm has stagnated and how it is then restarted, and when the whole run has used up its budget.
+
+    A policy is given to SolverConfig as a template; every run works on its own copy, so policies can keep per-run state. The budget, if any, is a number of fitness evaluations and/or of seconds since the run was seeded, and replaces the generation count as the limit of the run (see SolverConfig.Ng).
+    """
+
+    def __init__(self, evaluations=None, seconds=None):
+        self.evaluations = evaluations
+        self.seconds = seconds
+        self.start = None
+        return
+
+    def begin(self, ga):
+        """ Called when the run is seeded for the first time. """
+        self.start = time.time()
+        return
+
+    def stagnant(self, ga):
+        """ Called after every generation; returns True if the population should be restarted. """
+        raise NotImplementedError
+
+    def restart(self, ga):
+        """ Re-seed the whole population. """
+        ga.seed()
+        ga.stale = 0
+        ga.reset_mutation()
+        return
+
+    def exhausted(self, ga):
+        """ Whether the run has used up its budget. """
+        if (self.evaluations is not None and ga.evaluations >= self.evaluations):
+            return True
+        if (self.seconds is not None and self.start is not None and time.time() - self.start >= self.seconds):
+            return True
+        return False
+
+
+class StaleRestart(RestartPolicy):
+    """ The original policy: re-seed the whole population once the two fittest candidates have had exactly the same fitness for limit generations in a row. """
+
+    def __init__(self, limit=50, evaluations=None, seconds=None):
+        RestartPolicy.__init__(self, evaluations, seconds)
+        self.limit = limit
+        return
+
+    def stagnant(self, ga):
+        return ga.stale >= self.limit
+
+
+class ScheduledRestart(RestartPolicy):
+    """ Restarts on a schedule, keeping the elites: the population is restarted when its best fitness has not improved for a number of generations given by the schedule, or as soon as its diversity (the fraction of distinct candidates) falls below min_diversity.
+
+    With the "luby" schedule, the k-th restart waits unit times the k-th term of the Luby sequence; with the "geometric" one, unit times factor to the power k. A restart re-seeds the population but keeps copies of its keep fittest candidates (the number of elites by default), so progress is not thrown away. If the elites have not improved since the previous restart, though, they are stuck in a local optimum, and the restart is a full one.
+    """
+
+    def __init__(self, schedule="luby", unit=32, factor=1.5, min_diversity=0.05, keep=None, evaluations=None, seconds=None):
+        RestartPolicy.__init__(self, evaluations, seconds)
+        if (schedule not in ("luby", "geometric")):
+            raise ValueError("Unknown restart schedule '%s'; expected 'luby' or 'geometric'." % schedule)
+        self.schedule = schedule
+        self.unit = unit
+        self.factor = factor
+        self.min_diversity = min_diversity
+        self.keep = keep
+        self.count = 0  # Number of restarts so far.
+        self.best = None  # Best fitness since the last improvement, and the generation of that improvement.
+        self.improved = 0
+        self.kept = None  # Best fitness of the elites kept by the last restart.
+        return
+
+    def patience(self):
+        """ The number of generations without improvement before the next restart. """
+        if (self.schedule == "luby"):
+            return self.unit * luby(self.count + 1)
+        return int(self.unit * self.factor ** self.count)
+
+    def stagnant(self, ga):
+        best = float(numpy.max(ga.population.fitness))
+        if (self.best is None or best > self.best):
+            self.best = best
+            self.improved = ga.generation
+        if (ga.generation - self.improved >= self.patience()):
+            return True
+        return self.min_diversity > 0 and ga.population.diversity() < self.min_diversity
+
+    def restart(self, ga):
+        keep = ga.config.Ne if self.keep is None else self.keep
+        best = float(numpy.max(ga.population.fitness))
+        if (self.kept is not None and best <= self.kept):
+            keep = 0
+        elites = ga.population.fittest(keep)
+        self.kept = best if keep > 0 else None
+        RestartPolicy.restart(self, ga)
+        ga.immigrate(elites)
+        self.count += 1
+        self.best = float(numpy.max(ga.population.fitness))
+        self.improved = ga.generation
+        return
+
+
+RESTART_POLICIES = ("stale", "luby", "geometric")
+
+
+def restart_policy(name="stale", stale_limit=50, evaluations=None, seconds=None):
+    """ A restart policy by name: "stale" for StaleRestart, or "luby" or "geometric" for a ScheduledRestart on that schedule, with the given budget. """
+    if (name == "stale"):
+        return StaleRestart(stale_limit, evaluations, seconds)
+    if (name in RESTART_POLICIES):
+        return ScheduledRestart(name, evaluations=evaluations, seconds=seconds)
+    raise ValueError("Unknown restart policy '%s'; expected one of %s." % (name, ", ".join(RESTART_POLICIES)))
+
+
+class SolverConfig(object):
+    """ The parameters of a run of the genetic algorithm. The number of elites Ne defaults to 10% of the population size Nc. """
+
+    def __init__(self, Nc=500, Ne=None, Ng=500, mutation_rate=0.1, crossover_rate=0.9, stale_limit=50, propagate=True, backend="genetic", seed=None, local_search=0, restart=None):
+        self.Nc = Nc  # Number of candidates (i.e. population size).
+        self.Ne = int(0.1*Nc) if Ne is None else Ne  # Number of elites.
+        self.Ng = Ng  # Number of generations; None for no limit other than the budget of the restart policy (or a stop event).
+        self.mutation_rate = mutation_rate  # Initial mutation rate.
+        self.crossover_rate = crossover_rate
+        self.stale_limit = stale_limit  # Re-seed after this many generations without progress.
+        self.propagate = propagate  # Run constraint propagation on the puzzle before seeding.
+        self.backend = backend  # Name of the solver backend used by solve() (see BACKENDS).
+        self.seed = seed  # Seed of the random number generators; runs with the same seed are identical. None for a fresh seed.
+        self.local_search = local_search  # Number of min-conflicts steps applied to each elite every generation (memetic mode); 0 to disable.
+        self.restart = restart if restart is not None else StaleRestart(stale_limit)  # The RestartPolicy of the genetic algorithm.
+        return
+
+
+class SolverResult(object):
+    """ The outcome of a solver run: the solution (None if no solution was found) along with statistics about the run. """
+
+    def __init__(self, solution, best, generations, restarts, elapsed, history, evaluations=0):
+        self.solution = solution
+        self.best = best  # The fittest candidate of the last generation (None if there was none).
+        self.fitness = best.fitness if best is not None else 0.0
+        self.generations = generations  # Number of generations evaluated.
+        self.restarts = restarts
+        self.elapsed = elapsed  # Wall time in seconds.
+        self.history = history  # Best fitness of each generation.
+        self.evaluations = evaluations  # Number of candidate fitness evaluations.
+        self.cached = False  # Whether the solution came from a cache rather than from a solver run.
+        return
+
+    @property
+    def solved(self):
+        return self.solution is not None
+
+    @staticmethod
+    def settled(given, start, error=None):
+        """ The result of a puzzle that constraint propagation settled on its own, in a run started at the time start: solved by the values of given (the propagated puzzle), or without a solution if given is None (propagation found a contradiction), in which case the reason is kept in the error attribute. """
+        solution = None
+        if (given is not None):
+            solution = Candidate(given.Nd)
+            solution.values = numpy.copy(given.values)
+            solution.update_fitness()
+        result = SolverResult(solution, solution, 0, 0, time.time() - start, [])
+        if (given is None):
+            result.error = error if error is not None else "The puzzle has no solution."
+        return result
+
+    @staticmethod
+    def from_cache(solution, start):
+        """ The result of a puzzle answered from a solution cache, in a lookup started at the time start. """
+        result = SolverResult(solution, solution, 0, 0, time.time() - start, [])
+        result.cached = True
+        return result
+
+
+class Observer(object):
+    """ Receives progress notifications from a solver run. All notifications do nothing by default, so observers only need to override the ones that they are interested in. """
+
+    def on_seeded(self, ga):
+        """ Called when the population has been (re-)seeded. """
+        return
+
+    def on_generation(self, ga, best):
+        """ Called once per generation, with the fittest candidate of the current population. """
+        return
+
+    def on_finished(self, result):
+        """ Called with the SolverResult at the end of the run. """
+        return
+
+
+class Deadline(object):
+    """ A stop event (see solve) that is set by itself once the given number of seconds have passed. It only holds the time at which it expires, so it can be sent to worker processes without any inter-process communication. """
+
+    def __init__(self, seconds):
+        self.expires = time.time() + seconds
+        return
+
+    def is_set(self):
+        return time.time() >= self.expires
+
+    def remaining(self):
+        """ The number of seconds left, or 0 once the deadline has passed. """
+        return max(0.0, self.expires - time.time())
+
+
+class Stops(object):
+    """ A stop event that is set as soon as any of the given stop events (None for no event) is set. """
+
+    def __init__(self, *stops):
+        self.stops = [stop for stop in stops if stop is not None]
+        return
+
+    def is_set(self):
+        return any(stop.is_set() for stop in self.stops)
+
+
+class Observers(Observer):
+    """ Forwards the notifications of a solver run to several observers, e.g. a viewer and a metrics recorder. """
+
+    def __init__(self, *observers):
+        self.observers = [observer for observer in observers if observer is not None]
+        return
+
+    def on_seeded(self, ga):
+        for observer in self.observers:
+            observer.on_seeded(ga)
+        return
+
+    def on_generation(self, ga, best):
+        for observer in self.observers:
+            observer.on_generation(ga, best)
+        return
+
+    def on_finished(self, result):
+        for observer in self.observers:
+            observer.on_finished(result)
+        return
+
+
+class GeneticAlgorithm(object):
+    """ The evolution loop of the solver, advanced one generation at a time by evolve(), or for a number of generations by run().
+
+    All random numbers come from a single numpy Generator created from seed_sequence (by default a SeedSequence of config.seed), so a run can be replayed exactly from its seed.
+    """
+
+    def __init__(self, given, config, seed_sequence=None):
+        self.given = given
+        self.config = config
+        self.seed_sequence = seed_sequence if seed_sequence is not None else numpy.random.SeedSequence(config.seed)
+        self.rng = numpy.random.default_rng(self.seed_sequence)
+        self.policy = copy.deepcopy(config.restart)  # This run's own copy of the restart policy.
+        self.tournament = Tournament(self.rng)
+        self.crossover = CycleCrossover(self.rng)
+        self.swaps = SwapTable.of(given)
+        self.population = Population()
+        self.generation = 0
+        self.restarts = 0
+        self.evaluations = 0  # Number of candidate fitness evaluations so far.
+        self.timings = {}  # Seconds spent in each phase (selection, crossover, mutation, ...) of the last generation.
+        self.mutations = 0  # Number of successful mutations in the last generation, and how many of them improved the fitness.
+        self.improvements = 0
+        self.mutation_attempts = 0  # Number of swaps tried by the mutations of the last generation, legal or not.
+        self.probe = None  # If set, called with the name of each phase of evolve() as it ends (see profiler.Profiler).
+        self.stale = 0
+        self.history = []  # Best fitness of each generation evaluated so far.
+        self.fittest = None  # The fittest candidate of the last generation evaluated.
+        self.solution = None
+        self.reset_mutation()
+        return
+
+    def reset_mutation(self):
+        """ Restore the initial adaptive mutation parameters. """
+        self.Nm = 0  # Number of mutations.
+        self.phi = 0
+        self.sigma = 1
+        self.mutation_rate = self.config.mutation_rate
+        return
+
+    def seed(self):
+        """ Create an initial population. """
+        if (self.policy.start is None):
+            self.policy.begin(self)
+        self.population.seed(self.config.Nc, self.given, self.rng)
+        self.evaluations += self.config.Nc
+        return
+
+    def best(self):
+        """ A copy of the fittest candidate of the current population. """
+        return self.population.current.view(int(numpy.argmax(self.population.fitness))).copy()
+
+    def run(self, generations, observer=None, stop=None):
+        """ Evaluate up to the given number of generations (without limit if None), evolving the population after each one. Stops early when a solution is found, in which case it is returned (and kept in self.solution), when the restart policy's budget is used up, or when the stop event (e.g. a multiprocessing.Event) is set. """
+        g = 0
+        while (generations is None or g < generations):
+            g += 1
+            # Check for a solution.
+            self.fittest = self.best()
+            self.history.append(self.fittest.fitness)
+            if (observer is not None):
+                observer.on_generation(self, self.fittest)
+            if (self.fittest.fitness == 1):
+                self.solution = self.fittest
+                return self.solution
+
+            if (stop is not None and stop.is_set()):
+                break
+            if (self.policy.exhausted(self)):
+                break
+
+            if (self.evolve() and observer is not None):
+                observer.on_seeded(self)
+        return None
+
+    def result(self, elapsed):
+        """ Summarise the run so far as a SolverResult. Its seed attribute holds the entropy of the run's SeedSequence, which replays it when passed as SolverConfig.seed. """
+        fittest = self.fittest if self.fittest is not None else self.best()
+        result = SolverResult(self.solution, fittest, len(self.history), self.restarts, elapsed, self.history, self.evaluations)
+        result.seed = self.seed_sequence.entropy
+        return result
+
+    def immigrate(self, migrants):
+        """ Replace the weakest candidates of the population with copies of candidates from another population. """
+        weakest = self.population.bottom(len(migrants))
+        for k, migrant in zip(weakest, migrants):
+            self.population.current.store(k, migrant)
+        return
+
+    def evolve(self):
+        """ Create the next generation. Returns True if the population was restarted because it had stagnated (see RestartPolicy). """
+        Nc = self.config.Nc
+        Ne = self.config.Ne
+
+        # The next population is built in the spare buffer: children in slots [0, Nc-Ne), elites in [Nc-Ne, Nc).
+        current = self.population.current
+        following = self.population.spare
+
+        self.timings = {}
+        clock = time.perf_counter()
+
+        # Select elites (the fittest candidates) and preserve them for the next generation. These will not be affected by crossover or mutation.
+        following.take(current, self.population.top(Ne), Nc-Ne)
+        clock = self.lap("selection", clock)
+
+        # In memetic mode, improve the elites by local search. An elite is only replaced if its fitness did not drop.
+        if (self.config.local_search > 0):
+            for slot in range(Nc-Ne, Nc):
+                elite = following.view(slot).copy()
+                if (elite.local_search(self.given, self.config.local_search, self.rng) > 0 and elite.fitness >= following.fitness[slot]):
+                    following.store(slot, elite)
+                    self.evaluations += 1
+            clock = self.lap("local_search", clock)
+
+        # Select parents from population via tournaments, and make a copy of their genes in the children's slots.
+        parents = self.tournament.select(current.fitness, Nc-Ne)
+        following.take(current, parents, 0)
+        following.fitness[0:Nc-Ne] = 0.0  # The children have not been evaluated yet.
+        clock = self.lap("selection", clock)
+
+        # Draw the random numbers deciding which children are crossed over (and where) and mutated all at once.
+        cc = self.crossover
+        pairs = (Nc-Ne) // 2
+        crossing = self.rng.random(pairs) < self.config.crossover_rate
+        points = cc.crossover_points(self.given.Nd, pairs)
+        mutating = self.rng.random(Nc-Ne) < self.mutation_rate
+
+        # Cross over all the pairs of children at once, straight in the buffer.
+        crossed = numpy.flatnonzero(crossing)
+        cc.cross_batch(following, 2*crossed, 2*crossed+1, points[crossed])
+        clock = self.lap("crossover", clock)
+
+        # Mutate the children, all at once.
+        success = numpy.zeros(Nc-Ne, dtype=bool)
+        mutants = numpy.flatnonzero(mutating)
+        success[mutants], self.mutation_attempts = following.swap_random(mutants, self.swaps, self.rng)
+        clock = self.lap("mutation", clock)
+
+        # Update the fitness of the children from the column and block counts that crossover and mutation kept up to date.
+        old_fitness = following.fitness[0:Nc-Ne].copy()
+        following.refresh_fitness(numpy.arange(Nc-Ne))
+        clock = self.lap("fitness", clock)
+
+        # Used to calculate the relative success rate of mutations.
+        self.Nm += int(numpy.count_nonzero(success))
+        self.phi = self.phi + int(numpy.count_nonzero(success & (following.fitness[0:Nc-Ne] > old_fitness)))
+        self.mutations = self.Nm
+        self.improvements = self.phi
+
+        # Select next generation. All of its candidates already have an up to date fitness.
+        self.population.swap()
+        self.generation += 1
+        self.evaluations += Nc-Ne
+
+        # Calculate new adaptive mutation rate. This is to stop too much mutation as the fitness progresses towards unity.
+        if (self.Nm == 0):
+            self.phi = 0  # Avoid divide by zero.
+        else:
+            self.phi = self.phi / self.Nm
+
+        if (self.phi > 0.2):
+            self.sigma = self.sigma/0.998
+        elif (self.phi < 0.2):
+            self.sigma = self.sigma*0.998
+
+        self.mutation_rate = abs(self.rng.normal(
+            loc=0.0, scale=self.sigma, size=None))
+        self.Nm = 0
+        self.phi = 0
+
+        # Check for stale population.
+        first, second = self.population.leaders()
+        if (first != second):
+            self.stale = 0
+        else:
+            self.stale += 1
+
+        # Restart the population when the restart policy finds that it has stagnated, by default once stale_limit generations have passed with the fittest two candidates always having the same fitness.
+        if (self.policy.stagnant(self)):
+            self.restarts += 1
+            self.policy.restart(self)
+            self.lap("seeding", clock)
+            return True
+        return False
+
+    def lap(self, phase, clock):
+        """ Add the time since clock to the time spent in a phase of the last generation (see timings), returning the current time. """
+        now = time.perf_counter()
+        self.timings[phase] = self.timings.get(phase, 0.0) + (now - clock)
+        if (self.probe is not None):
+            self.probe(phase)
+            now = time.perf_counter()  # Leave the time spent in the probe out of the next phase.
+        return now
+
+
+def solve(given, config=None, observer=None, cache=None, stop=None, backend=None):
+    """ Solve a Sudoku puzzle with the backend named by config.backend, the genetic algorithm by default, or with the given Backend (e.g. an IslandBackend with other settings than the registered one). This needs no display; progress can be followed by passing an Observer.
+
+    The run stops early, without a solution, once the stop event (anything with an is_set() method, such as a Deadline or a multiprocessing.Event) is set. If a cache (e.g. a cache.SolutionCache) is given, a puzzle that it already holds (or an equivalent one) is answered from it, with the cached attribute of the result set, and new solutions are added to it.
+
+    Returns a SolverResult whose solution is None if no solution was found. If the puzzle was shown to have no solution, the reason is kept in the error attribute of the result.
+    """
+    if (config is None):
+        config = SolverConfig()
+    if (backend is None and config.backend not in BACKENDS):
+        raise ValueError("Unknown solver backend '%s'; expected one of %s." % (config.backend, ", ".join(sorted(BACKENDS))))
+    if (cache is not None):
+        start = time.time()
+        solution = cache.get(given)
+        if (solution is not None):
+            result = SolverResult.from_cache(solution, start)
+            if (observer is not None):
+                observer.on_finished(result)
+            return result
+
+    if (backend is None):
+        backend = BACKENDS[config.backend]
+    result = backend.solve(given, config, observer, stop)
+    if (cache is not None and result.solved):
+        cache.put(given, result.solution)
+    return result
+
+
+def solve_genetic(given, config=None, observer=None, stop=None):
+    """ Solve a Sudoku puzzle with the genetic algorithm, returning a SolverResult whose solution is None if no solution was found within config.Ng generations, or before the stop event (e.g. a Deadline) was set. """
+    if (config is None):
+        config = SolverConfig()
+    if (observer is None):
+        observer = Observer()
+
+    start = time.time()
+    try:
+        if (config.propagate):
+            given = given.propagate()
+        if (not given.is_solved()):
+            ga = GeneticAlgorithm(given, config)
+            ga.seed()
+    except ValueError as e:
+        # Propagation or seeding found that the puzzle has no solution.
+        result = SolverResult.settled(None, start, str(e))
+        observer.on_finished(result)
+        return result
+    if (given.is_solved()):
+        # Solved by propagation alone.
+        result = SolverResult.settled(given, start)
+        observer.on_finished(result)
+        return result
+
+    observer.on_seeded(ga)
+    ga.run(config.Ng, observer, stop)
+
+    result = ga.result(time.time() - start)
+    observer.on_finished(result)
+    return result
+
+
+def _evolve_island(ga, migrants, generations, found, stop=None):
+    """ Advance one island by up to the given number of generations in a worker process, or until found (set by the island that finds a solution) or the caller's stop event is set. The island is seeded on its first epoch. """
+    start = time.time()
+    if (ga.population.Nc == 0):
+        ga.seed()
+    if (len(migrants) > 0):
+        ga.immigrate(migrants)
+    if (ga.run(generations, stop=Stops(found, stop)) is not None):
+        found.set()
+    return ga, time.time() - start
+
+
+def solve_islands(given, config=None, islands=4, migration_interval=20, migrants=5, topology="ring", processes=None, stop=None):
+    """ Solve a Sudoku puzzle with an island model: several independent populations evolve in parallel worker processes, one per core by default.
+
+    Every migration_interval generations the fittest migrants of each island replace the weakest candidates of its neighbours, either the next island in a ring ("ring") or all other islands ("all"). All islands stop as soon as any of them finds a solution, or after config.Ng generations. Returns a SolverResult for the whole run, with the result of each island in its islands attribute.
+
+    A stop event given by the caller is checked by the islands at every generation if it can be sent to the worker processes (e.g. a Deadline, or Stops of Deadlines), and only between migrations otherwise.
+
+    Each island draws its random numbers from its own stream, spawned from a SeedSequence of config.seed. The islands exchange migrants in lockstep, so a run is reproducible from its seed up to the point where an island finds a solution (the other islands then stop at whatever generation they have reached).
+    """
+    if (config is None):
+        config = SolverConfig()
+    if (topology not in ("ring", "all")):
+        raise ValueError("Unknown migration topology '%s'; expected 'ring' or 'all'." % topology)
+
+    start = time.time()
+    if (config.propagate):
+        try:
+            given = given.propagate()
+        except ValueError as e:
+            result = SolverResult.settled(None, start, str(e))
+            result.islands = []
+            return result
+        if (given.is_solved()):
+            result = solve_genetic(given, config)
+            result.islands = []
+            return result
+
+    seed_sequence = numpy.random.SeedSequence(config.seed)
+    states = [GeneticAlgorithm(given, config, stream) for stream in seed_sequence.spawn(islands)]
+    times = [0.0] * islands
+    incoming = [[] for i in range(0, islands)]
+    remaining = config.Ng if config.Ng is not None else sys.maxsize
+    try:
+        pickle.dumps(stop)
+        shared = stop  # Sent along with every epoch, so that the islands stop at their next generation.
+    except (TypeError, AttributeError, pickle.PicklingError):
+        shared = None
+
+    with multiprocessing.Manager() as manager:
+        found = manager.Event()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes or min(islands, multiprocessing.cpu_count())) as pool:
+            while (remaining > 0 and not found.is_set() and not (stop is not None and stop.is_set())):
+                epoch = min(migration_interval, remaining)
+                futures = [pool.submit(_evolve_island, states[i], incoming[i], epoch, found, shared) for i in range(0, islands)]
+                for i, future in enumerate(futures):
+                    states[i], elapsed = future.result()
+                    times[i] += elapsed
+                remaining -= epoch
+                if (all(ga.policy.exhausted(ga) for ga in states)):
+                    break
+
+                # Exchange the fittest candidates between islands.
+                emigrants = [ga.population.fittest(migrants) for ga in states]
+                if (topology == "ring"):
+                    incoming = [emigrants[i-1] if islands > 1 else [] for i in range(0, islands)]
+                else:
+                    incoming = [[m for j in range(0, islands) if j != i for m in emigrants[j]] for i in range(0, islands)]
+
+    results = [ga.result(times[i]) for i, ga in enumerate(states)]
+    solved = [r for r in results if r.solved]
+    best = solved[0] if len(solved) > 0 else max(results, key=lambda r: r.fitness)
+    result = SolverResult(best.solution, best.best, max(r.generations for r in results), sum(r.restarts for r in results), time.time() - start, best.history, sum(r.evaluations for r in results))
+    result.seed = seed_sequence.entropy
+    result.islands = results
+    return result
+
+
+def _eliminate(domains, board, pending):
+    """ Remove values from the domains (updated in place) of an exact search, following up every consequence: a cell that is left with a single value rules it out for its peers, and a value that is left with a single place in a unit is assigned there. pending is a list of (cell, bitmask of the values to remove). Returns False on a contradiction. """
+    while (len(pending) > 0):
+        cell, bits = pending.pop()
+        mask = domains[cell]
+        removed = mask & bits
+        if (removed == 0):
+            continue
+        mask &= ~bits
+        domains[cell] = mask
+        if (mask == 0):
+            return False
+        if (mask & (mask - 1) == 0):
+            for peer in board.peers[cell]:
+                if (domains[peer] & mask):
+                    pending.append((peer, mask))
+
+        while (removed):
+            bit = removed & -removed
+            removed &= ~bit
+            for unit in board.cell_units[cell]:
+                place = -1
+                for other in unit:
+                    if (domains[other] & bit):
+                        if (place >= 0):
+                            place = -2
+                            break
+                        place = other
+                if (place == -1):
+                    return False
+                if (place >= 0 and domains[place] != bit):
+                    pending.append((place, domains[place] & ~bit))
+    return True
+
+
+class Backend(object):
+    """ A way of solving a puzzle. Backends are registered by name in BACKENDS, which is how solve() finds the one named by SolverConfig.backend. """
+
+    def solve(self, given, config, observer=None, stop=None):
+        """ Solve the puzzle, returning a SolverResult. The run is abandoned as soon as possible once the stop event (e.g. a Deadline) is set. """
+        raise NotImplementedError
+
+
+class GeneticBackend(Backend):
+    """ The genetic algorithm, on a single population. """
+
+    def solve(self, given, config, observer=None, stop=None):
+        return solve_genetic(given, config, observer, stop)
+
+
+class IslandBackend(Backend):
+    """ The genetic algorithm, on several populations evolving in parallel processes (see solve_islands). """
+
+    def __init__(self, islands=4, migration_interval=20, migrants=5, topology="ring", processes=None):
+        self.islands = islands
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.topology = topology
+        self.processes = processes
+        return
+
+    def solve(self, given, config, observer=None, stop=None):
+        result = solve_islands(given, config, self.islands, self.migration_interval, self.migrants, self.topology, self.processes, stop)
+        if (observer is not None):
+            observer.on_finished(result)
+        return result
+
+
+class ExactBackend(Backend):
+    """ An exact solver: depth-first search over the bitmask domains, always branching on the free cell with the fewest possible values (minimum remaining values), with singles propagated after every choice.
+
+    Unlike the genetic algorithm it always finds a solution if there is one, and it is deterministic. The number of search nodes is kept in the nodes attribute of the result.
+    """
+
+    def solve(self, given, config=None, observer=None, stop=None):
+        start = time.time()
+        board = given.board
+        Nd = given.Nd
+
+        solution = None
+        nodes = 0
+        stopped = False
+        domains = given.domains.ravel().tolist()
+        if (propagate(domains, board, pairs=False)):
+            stack = [domains]
+            while (len(stack) > 0):
+                domains = stack.pop()
+                nodes += 1
+                if (stop is not None and nodes % 1024 == 0 and stop.is_set()):
+                    stopped = True
+                    break
+
+                # Pick the free cell with the fewest possible values.
+                cell = -1
+                fewest = Nd + 1
+                for c in range(0, Nd*Nd):
+                    mask = domains[c]
+                    if (mask & (mask - 1)):
+                        count = popcount(mask)
+                        if (count < fewest):
+                            cell = c
+                            fewest = count
+                            if (count == 2):
+                                break
+                if (cell < 0):
+                    solution = domains
+                    break
+
+                # Try its values in increasing order (the last one pushed is explored first).
+                for value in reversed(mask_values(domains[cell])):
+                    bit = 1 << (value - 1)
+                    branch = list(domains)
+                    if (_eliminate(branch, board, [(cell, domains[cell] & ~bit)])):
+                        stack.append(branch)
+
+        if (solution is not None):
+            candidate = Candidate(Nd)
+            candidate.values = numpy.reshape([mask.bit_length() for mask in solution], (Nd, Nd))
+            candidate.update_fitness()
         else:
-            x = generations
-            y = fitness_values
+            candidate = None
+        result = SolverResult(candidate, candidate, 0, 0, time.time() - start, [])
+        result.nodes = nodes
+        if (candidate is None and not stopped):
+            result.error = "The puzzle has no solution."  # The whole search tree was explored.
+        if (observer is not None):
+            observer.on_finished(result)
+        return result
 
-        self.ax.clear()
-        self.ax.plot(x, y, marker='o', linestyle='-', color='b')
 
-        # Set labels and title
-        self.ax.set_xlabel('Generation')
-        self.ax.set_ylabel('Fitness')
-        self.ax.set_title('Fitness vs Generation')
+def difficulty(given, propagated=False):
+    """ Cheap features of how hard a puzzle is, from its grid and its domains: the number of givens and the fraction of the grid they fill, the mean and largest domain sizes of the free cells after the given values are ruled out of their peers, how many free cells constraint propagation fixes (see Given.propagate) and how many it leaves, and the size of the search space that remains, as the log10 of the product of the domain sizes. contradiction is True if propagation finds that the puzzle has no solution. propagated is the result of given.propagate() if it is already known (None for a contradiction).
 
-        self.canvas.draw()
+    Returns the features as a dict.
+    """
+    if (propagated is False):
+        try:
+            propagated = given.propagate()
+        except ValueError:
+            propagated = None
+    free = (given.values == 0)
+    sizes = numpy.array([popcount(int(mask)) for mask in given.domains[free]])
+    features = {"size": given.Nd,
+                "givens": int(given.Nd*given.Nd - numpy.count_nonzero(free)),
+                "fill": float(1.0 - numpy.mean(free)),
+                "mean_domain": float(numpy.mean(sizes)) if len(sizes) > 0 else 0.0,
+                "max_domain": int(numpy.max(sizes)) if len(sizes) > 0 else 0,
+                "contradiction": propagated is None}
+    if (propagated is None):
+        features.update(propagated=0, remaining=int(numpy.count_nonzero(free)), log_space=0.0)
+    else:
+        remaining = (propagated.values == 0)
+        features["propagated"] = int(numpy.count_nonzero(free) - numpy.count_nonzero(remaining))
+        features["remaining"] = int(numpy.count_nonzero(remaining))
+        features["log_space"] = float(sum(numpy.log10(popcount(int(mask))) for mask in propagated.domains[remaining]))
+    return features
+
+
+class AutoBackend(Backend):
+    """ Picks the backends and parameters for each puzzle from its difficulty features (see difficulty), so that easy puzzles do not go through a large genetic algorithm and hard ones get more than the defaults. The tiers are:
+
+    - propagation: constraint propagation alone solves the puzzle (or shows that it has no solution);
+    - exact: the exact search, given up after exact_seconds;
+    - small: the genetic algorithm with a population of small_population, for a remaining search space of at most 10^small_limit;
+    - large: the island model, with large_islands populations of large_population each, for larger search spaces.
+
+    On the bundled instances and on puzzles made sparser from them, the exact search is faster than the genetic algorithm whenever propagation does not settle the puzzle, so it is always tried first; the genetic algorithm only gets the puzzles on which the search blows up. The genetic tiers keep the seed, restart policy and memetic setting of the config.
+
+    Each decision, with the features, the tiers tried and the outcome, is kept in the route attribute of the result and written to the log (any sink with a write(record) method, see metrics.JsonLinesSink) if one is given, so that the thresholds can be tuned later.
+    """
 
-    def display_matrix(self, matrix):
-        matrix_list = matrix.tolist()
+    TIERS = ("propagation", "exact", "small", "large")
 
-        num_rows = len(matrix_list)
-        num_cols = len(matrix_list[0]) if matrix_list else 0
+    def __init__(self, exact_seconds=5.0, small_limit=150.0, small_population=100, large_population=500, large_islands=4, log=None):
+        self.exact_seconds = exact_seconds
+        self.small_limit = small_limit
+        self.small_population = small_population
+        self.large_population = large_population
+        self.large_islands = large_islands
+        self.log = log
+        return
 
-        # Update existing labels or create new labels if necessary
-        for i in range(num_rows):
-            for j in range(num_cols):
-                if len(self.matrix_labels) <= i * num_cols + j:
-                    label = tk.Label(self.root, borderwidth=1, relief="solid",
-                                     width=5, height=2, font=('Inter', 12, 'bold'))
-                    label.grid(row=i, column=j)
-                    self.matrix_labels.append(label)
+    def route(self, features):
+        """ The tiers (see TIERS) to try in turn for a puzzle with the given difficulty features. """
+        if (features["contradiction"] or features["remaining"] == 0):
+            return ["propagation"]
+        if (features["log_space"] <= self.small_limit):
+            return ["exact", "small"]
+        return ["exact", "large"]
+
+    def solve(self, given, config=None, observer=None, stop=None):
+        if (config is None):
+            config = SolverConfig()
+        start = time.time()
+        contradiction = None
+        try:
+            propagated = given.propagate()
+        except ValueError as e:
+            propagated = None
+            contradiction = str(e)
+        features = difficulty(given, propagated)
+        tiers = self.route(features)
+
+        # The propagated puzzle is passed on, so that the backends do not propagate it again.
+        settings = {}
+        tried = []
+        for tier in tiers:
+            tried.append(tier)
+            if (tier == "propagation"):
+                result = SolverResult.settled(propagated, start, contradiction)
+            elif (tier == "exact"):
+                budget = Deadline(self.exact_seconds)
+                result = BACKENDS["exact"].solve(propagated, config, None, Stops(stop, budget))
+                if (result.solved or not budget.is_set() or (stop is not None and stop.is_set())):
+                    break  # Solved, shown to have no solution, or out of time.
+                continue
+            else:
+                tier_config = copy.copy(config)
+                tier_config.propagate = False
+                tier_config.Nc = self.small_population if tier == "small" else self.large_population
+                tier_config.Ne = int(0.1*tier_config.Nc)
+                settings["Nc"] = tier_config.Nc
+                if (tier == "small"):
+                    result = solve_genetic(propagated, tier_config, None, stop)
                 else:
-                    label = self.matrix_labels[i * num_cols + j]
+                    result = IslandBackend(self.large_islands).solve(propagated, tier_config, None, stop)
+                    settings["islands"] = self.large_islands
+        result.elapsed = time.time() - start
+        if (observer is not None):
+            observer.on_finished(result)
+
+        result.route = {"tier": tried[-1], "tried": tried, "settings": settings, "features": features, "solved": result.solved, "elapsed": result.elapsed}
+        if (self.log is not None):
+            self.log.write(dict(result.route, event="route"))
+        return result
 
-                label.config(text=str(matrix_list[i][j]))
 
-    def run(self):
-        self.root.mainloop()
+BACKENDS = {
+    "genetic": GeneticBackend(),
+    "islands": IslandBackend(),
+    "exact": ExactBackend(),
+    "auto": AutoBackend(),
+}
 
 
 class Sudoku(object):
@@ -443,24 +1712,21 @@ class Sudoku(object):
 
     def __init__(self):
         self.given = None
+        self.result = None
         return
 
     def load(self, path):
         # Load a configuration to solve.
         with open(path, "r") as f:
-            # Skip the first two lines
-            next(f)
-            next(f)
-
-            lines = f.readlines()
-
-        values = []
-        for line in lines:
-            row_values = [int(val) if val !=
-                          '-1' else 0 for val in line.split()]
-            values.append(row_values)
+            self.loads(f.read())
+        return
 
-        self.given = Given(values)
+    def loads(self, text):
+        """ Load a configuration to solve from a string in the format of the instance files. """
+        # The first line holds the box size (3 for 9x9, 4 for 16x16, 5 for 25x25); the second is skipped (see puzzles.parse_instance).
+        box, values = puzzles.parse_instance(text)
+        self.given = Given(values, box)
+        return
 
     def save(self, path, solution):
         # Save a configuration to a file.
@@ -469,176 +1735,107 @@ class Sudoku(object):
                 f.write(" ".join(map(str, row)) + "\n")
         return
 
-    def solve(self):
-        # Nc = 1000  # Number of candidates (i.e. population size).
-        # Ne = int(0.05*Nc)  # Number of elites.
-        # Ng = 1000  # Number of generations.
-        # Nm = 0  # Number of mutations.
-        Nc = 500  # Number of candidates (i.e. population size).
-        Ne = int(0.1*Nc)  # Number of elites.
-        Ng = 500  # Number of generations.
-        Nm = 0  # Number of mutations.
-
-        # Mutation parameters.
-        phi = 0
-        sigma = 1
-        # mutation_rate = 0.06
-        mutation_rate = 0.1
-
-        # Create an initial population.
-        self.population = Population()
-        self.population.seed(Nc, self.given)
-
-        # For up to 10000 generations...
-        stale = 0
-        ga_viewer = GeneticAlgorithmViewer()
-        st = time.time()
-        Restarts = 0
-        generation_list = []
-        fitness_list = []
-        for generation in range(0, Ng):
-            # print("Generation %d" % generation)
-            # Check for a solution.
-            best_fitness = 0.0
-            generation_list.append(generation)
-            for c in range(0, Nc):
-                fitness = self.population.candidates[c].fitness
-                if (fitness == 1):
-                    print("Solution found at generation %d!" % generation)
-                    print(self.population.candidates[c].values)
-                    fitness_list.append(fitness)
-                    ga_viewer.generation_label.config(
-                        text=f"Generation: {generation}")
-                    ga_viewer.fitness_label.config(text=f"Fitness: {fitness}")
-                    ga_viewer.solution_label.config(
-                        text=f"Solution found at generation {generation}")
-                    ga_viewer.display_matrix(
-                        self.population.candidates[c].values)
-                    ga_viewer.update_matplotlib_figure(
-                        generation_list, fitness_list)
-                    ga_viewer.root.update()
-                    et = time.time()
-                    ga_viewer.time_label.config(
-                        text=f"Time taken: {round(et-st,2)} sec")
-                    ga_viewer.run()
-                    return self.population.candidates[c]
-
-                # Find the best fitness.
-                if (fitness > best_fitness):
-                    best_fitness = fitness
-
-            # print("Best fitness: %f" % best_fitness)
-            fitness_list.append(best_fitness)
-            ga_viewer.generation_label.config(text=f"Generation: {generation}")
-            ga_viewer.fitness_label.config(text=f"Fitness: {best_fitness}")
-            ga_viewer.display_matrix(self.population.candidates[c].values)
-            ga_viewer.update_matplotlib_figure(generation_list, fitness_list)
-            ga_viewer.root.update()
-
-            # Create the next population.
-            next_population = []
-
-            # Select elites (the fittest candidates) and preserve them for the next generation.
-            self.population.sort()
-            elites = []
-            for e in range(0, Ne):
-                elite = Candidate()
-                elite.values = numpy.copy(self.population.candidates[e].values)
-                elites.append(elite)
-
-            # Create the rest of the candidates.
-            for count in range(Ne, Nc, 2):
-                # Select parents from population via a tournament.
-                t = Tournament()
-                parent1 = t.compete(self.population.candidates)
-                parent2 = t.compete(self.population.candidates)
-
-                # Cross-over.
-                cc = CycleCrossover()
-                child1, child2 = cc.crossover(
-                    parent1, parent2, crossover_rate=0.9)
-
-                # Mutate child1.
-                old_fitness = child1.fitness
-                success = child1.mutate(mutation_rate, self.given)
-                child1.update_fitness()
-                if (success):
-                    Nm += 1
-                    # Used to calculate the relative success rate of mutations.
-                    if (child1.fitness > old_fitness):
-                        phi = phi + 1
-
-                # Mutate child2.
-                old_fitness = child2.fitness
-                success = child2.mutate(mutation_rate, self.given)
-                child2.update_fitness()
-                if (success):
-                    Nm += 1
-                    # Used to calculate the relative success rate of mutations.
-                    if (child2.fitness > old_fitness):
-                        phi = phi + 1
-
-                # Add children to new population.
-                next_population.append(child1)
-                next_population.append(child2)
-
-            # Append elites onto the end of the population. These will not have been affected by crossover or mutation.
-            for e in range(0, Ne):
-                next_population.append(elites[e])
-
-            # Select next generation.
-            self.population.candidates = next_population
-            self.population.update_fitness()
-
-            # Calculate new adaptive mutation rate. This is to stop too much mutation as the fitness progresses towards unity.
-            if (Nm == 0):
-                phi = 0  # Avoid divide by zero.
-            else:
-                phi = phi / Nm
-
-            if (phi > 0.2):
-                sigma = sigma/0.998
-            elif (phi < 0.2):
-                sigma = sigma*0.998
-
-            mutation_rate = abs(numpy.random.normal(
-                loc=0.0, scale=sigma, size=None))
-            Nm = 0
-            phi = 0
-
-            # Check for stale population.
-            self.population.sort()
-            if (self.population.candidates[0].fitness != self.population.candidates[1].fitness):
-                stale = 0
-            else:
-                stale += 1
-
-            # Re-seed the population if 100 generations have passed with the fittest two candidates always having the same fitness.
-            if (stale >= 50):
-                Restarts += 1
-                ga_viewer.seeding_label.config(
-                    text=f"Stagnation detected. Re-seeding...", fg='red')
-                ga_viewer.display_matrix(self.population.candidates[c].values)
-                ga_viewer.root.update()
-                self.population.seed(Nc, self.given)
-                ga_viewer.seeding_label.config(
-                    text=f"Re-seeded... {Restarts}th time", fg='green')
-                ga_viewer.display_matrix(self.population.candidates[c].values)
-                ga_viewer.root.update()
-                stale = 0
-                sigma = 1
-                phi = 0
-                Nm = 0
-                mutation_rate = 0.1
-
-        ga_viewer.solution_label.config(
-            text=f"No Solution till {generation+1} generations", fg='red')
-        ga_viewer.root.update()
+    def solve(self, config=None, observer=None, cache=None, backend=None):
+        """ Solve the loaded puzzle, returning the solution or None. The statistics of the run are kept in self.result. """
+        self.result = solve(self.given, config, observer, cache, backend=backend)
+        return self.result.solution
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a Sudoku puzzle using a genetic algorithm.")
+    parser.add_argument("path", nargs="?", default="./instances/instance-1.txt", help="the puzzle to solve")
+    parser.add_argument("--headless", action="store_true", help="run without the Tkinter viewer")
+    parser.add_argument("--fps", type=float, default=10, help="maximum number of viewer redraws per second")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="genetic", help="the solver backend to use")
+    parser.add_argument("--islands", type=int, default=0, help="evolve this many populations in parallel processes (implies --headless)")
+    parser.add_argument("--migration-interval", type=int, default=20, help="generations between migrations of the island model")
+    parser.add_argument("--topology", choices=("ring", "all"), default="ring", help="migration topology of the island model")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random number generators, to replay a run")
+    parser.add_argument("--local-search", type=int, default=0, help="min-conflicts steps applied to each elite every generation (memetic mode)")
+    parser.add_argument("--metrics", default=None, help="write per-generation metrics of the run to this JSON-lines file")
+    parser.add_argument("--metrics-every", type=int, default=1, help="record the metrics every this many generations")
+    parser.add_argument("--cache", default=None, help="look the puzzle up in (and add its solution to) this solution cache database")
+    parser.add_argument("--restart", choices=RESTART_POLICIES, default="stale", help="the restart policy of the genetic algorithm")
+    parser.add_argument("--budget-seconds", type=float, default=None, help="give up after this many seconds instead of a number of generations")
+    parser.add_argument("--budget-evaluations", type=int, default=None, help="give up after this many fitness evaluations instead of a number of generations")
+    parser.add_argument("--route-log", default=None, help="write the routing decision of the auto backend to this JSON-lines file")
+    parser.add_argument("--profile", action="store_true", help="print how the time and memory of the run split between the phases of a generation")
+    parser.add_argument("--profile-json", default=None, help="write the profile to this JSON file (implies --profile)")
+    parser.add_argument("--profile-stacks", default=None, help="write the profile to this file as collapsed stacks for flame graph tools (implies --profile)")
+    args = parser.parse_args()
+    profile = args.profile or args.profile_json is not None or args.profile_stacks is not None
+    if (args.route_log is not None and (args.backend != "auto" or args.islands > 0)):
+        parser.error("--route-log needs --backend auto (and no --islands)")
+
+    s = Sudoku()
+    s.load(args.path)
+    budget = args.budget_seconds is not None or args.budget_evaluations is not None
+    config = SolverConfig(Ng=None if budget else 500, backend=args.backend, seed=args.seed, local_search=args.local_search,
+                          restart=restart_policy(args.restart, evaluations=args.budget_evaluations, seconds=args.budget_seconds))
+    observer = metrics = None
+    if (args.metrics is not None):
+        from metrics import JsonLinesSink, MetricsObserver
+        observer = metrics = MetricsObserver(JsonLinesSink(args.metrics), sample_every=args.metrics_every)
+    cache = None
+    if (args.cache is not None):
+        from cache import SolutionCache
+        cache = SolutionCache(args.cache)
+    backend = None
+    if (args.route_log is not None):
+        from metrics import JsonLinesSink
+        backend = AutoBackend(log=JsonLinesSink(args.route_log))
+
+    if (args.islands > 0):
+        args.headless = True
+        solution = s.solve(config, cache=cache, backend=IslandBackend(args.islands, args.migration_interval, topology=args.topology))
+        for i, r in enumerate(getattr(s.result, "islands", [])):  # A cached result has no islands.
+            print("Island %d: fitness %f after %d generations, %d restarts, %.2f sec" % (i, r.fitness, r.generations, r.restarts, r.elapsed))
+        if (profile):
+            print("Profiling is not available with --islands, since the islands evolve in other processes.", file=sys.stderr)
+    else:
+        if (not args.headless):
+            from viewer import GeneticAlgorithmViewer
+            ga_viewer = GeneticAlgorithmViewer(max_redraws_per_second=args.fps)
+            observer = Observers(ga_viewer, observer)
+        profiler = None
+        if (profile):
+            from profiler import Profiler
+            profiler = observer = Profiler(observer)
+        solution = s.solve(config, observer=observer, cache=cache, backend=backend)
+        if (profiler is not None):
+            profiler.print_report()
+            if (args.profile_json is not None):
+                profiler.dump(args.profile_json)
+            if (args.profile_stacks is not None):
+                profiler.write_stacks(args.profile_stacks)
+
+    if (cache is not None):
+        cache.close()
+    if (backend is not None):
+        backend.log.close()
+    if (metrics is not None):
+        metrics.close()
+
+    if (solution is not None):
+        if (s.result.cached):
+            print("Solution found in the cache!")
+        elif (s.result.generations > 0):
+            print("Solution found at generation %d!" % (s.result.generations - 1))
+        else:
+            print("Solution found!")
+        print(solution.values)
+    elif (hasattr(s.result, "error")):
+        print("No solution found: %s" % s.result.error)
+    else:
+        print("No solution found.")
+    if (hasattr(s.result, "route")):
+        print("Routed to the %s tier (%d givens, %d cells left after propagation, search space 10^%.1f)" % (
+            s.result.route["tier"], s.result.route["features"]["givens"], s.result.route["features"]["remaining"], s.result.route["features"]["log_space"]))
+    print("Time taken: %.2f sec, %d restarts" % (s.result.elapsed, s.result.restarts))
+
+    if (not args.headless):
         ga_viewer.run()
-        # print("No solution found.")
-        return None
 
 
-s = Sudoku()
-s.load("./instances/instance-1.txt")
-solution = s.solve()
+if __name__ == "__main__":
+    main()
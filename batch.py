@@ -0,0 +1,333 @@
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy
+
+from Sudoku import BACKENDS, AutoBackend, Given, SolverConfig, SolverResult, Sudoku, solve
+from cache import SolutionCache
+from puzzles import SYMBOLS, is_bank, open_bank, parse_lines, write_bank
+
+
+def parse_line(line):
+    """ Parse a puzzle written on a single line, e.g. the 81-character format of the common 9x9 datasets, with '.' or '0' for a blank cell. Larger puzzles use the letters A-P for the values 10 to 25. If the line has comma-separated fields (as in "puzzle,solution" CSV files), only the first one is used. See puzzles.parse_lines to parse many lines at once.
+
+    Returns the (Nd, Nd) array of values, with 0 for blank cells.
+    """
+    return parse_lines([line])[0]
+
+
+def format_line(values):
+    """ Write a grid in the one-puzzle-per-line format (see parse_line). """
+    return "".join(SYMBOLS[v-1] if v > 0 else "." for v in numpy.ravel(values))
+
+
+def _is_instance_file(path):
+    """ Check whether a file is in the format of the instances/ directory, i.e. starts with a line holding a box size (2 to 6) and a second header line holding a single number. A first line of digits alone is not enough, since it is also how the one-puzzle-per-line datasets write a puzzle with '0' for the blank cells. """
+    with open(path, "r") as f:
+        box, second = f.readline().strip(), f.readline().strip()
+    return box.isdigit() and 2 <= int(box) <= 6 and second.lstrip("-").isdigit()
+
+
+def read_puzzles(sources):
+    """ Stream the puzzles from a list of sources, yielding (name, values) pairs one at a time so that inputs of any size can be processed in bounded memory.
+
+    A source can be a directory (all of its .txt files), a glob pattern, a puzzle file in the instances/ format, a puzzle bank (see puzzles.write_bank), a file with one puzzle per line (see parse_line), or "-" for one puzzle per line on standard input. Lines are yielded unparsed, and the puzzles of a bank as (bank, index) references, so that the workers parse or map them themselves. A file that cannot be read or parsed here is yielded as its ValueError, which _values raises again, so that it is reported like any malformed puzzle rather than stopping the batch.
+    """
+    for source in sources:
+        if (source == "-"):
+            for number, line in enumerate(sys.stdin, 1):
+                if (line.strip()):
+                    yield "stdin:%d" % number, line
+            continue
+
+        if (os.path.isdir(source)):
+            paths = sorted(glob.glob(os.path.join(source, "*.txt")))
+        elif (glob.has_magic(source)):
+            paths = sorted(glob.glob(source))
+        else:
+            paths = [source]
+
+        for path in paths:
+            try:
+                bank = open_bank(path) if is_bank(path) else None
+                instance = bank is None and _is_instance_file(path)
+                if (instance):
+                    s = Sudoku()
+                    s.load(path)
+            except (OSError, ValueError) as e:
+                yield path, ValueError("Cannot read %s: %s" % (path, e))
+                continue
+
+            if (bank is not None):
+                for index in range(0, len(bank)):
+                    yield "%s:%d" % (path, index), (bank, index)
+            elif (instance):
+                yield path, s.given.values
+            else:
+                with open(path, "r") as f:
+                    for number, line in enumerate(f, 1):
+                        if (line.strip()):
+                            yield "%s:%d" % (path, number), line
+
+
+def _record(name, result):
+    """ The record of a solved (or unsolved) puzzle. """
+    record = {"name": name,
+              "solved": result.solved,
+              "cached": result.cached,
+              "solution": format_line(result.solution.values) if result.solved else None,
+              "fitness": result.fitness,
+              "generations": result.generations,
+              "restarts": result.restarts}
+    if (hasattr(result, "error")):
+        record["error"] = result.error
+    if (hasattr(result, "route")):
+        record["route"] = result.route["tier"]  # The decision of the auto backend, for tuning its thresholds.
+        record["tried"] = result.route["tried"]
+        record["settings"] = result.route["settings"]
+        record["features"] = result.route["features"]
+    return record
+
+
+def _solve_chunk(chunk, config, cache_path=None, width=0):
+    """ Solve a chunk of puzzles in a worker process. Lines are parsed here rather than in the reading process, so that parsing is spread over the workers too, and puzzles from a bank are taken from the worker's own map of it. If cache_path is given, puzzles are looked up in (and their solutions added to) the solution cache database at that path. If width is positive, the genetic algorithm evolves up to width puzzles of the chunk at once (see multipuzzle.solve_many). """
+    cache = SolutionCache(cache_path) if cache_path is not None else None
+    records = []
+    if (width > 0):
+        records = _solve_many(chunk, config, cache, width)
+        chunk = []
+    for name, puzzle in chunk:
+        start = time.time()
+        try:
+            values = _values(puzzle)
+            record = _record(name, solve(Given(values), config, cache=cache))
+        except ValueError as e:
+            # Malformed or unsolvable puzzles are reported rather than stopping the batch.
+            record = {"name": name, "solved": False, "error": str(e)}
+        record["elapsed"] = time.time() - start
+        records.append(record)
+    if (cache is not None):
+        cache.close()
+    return records
+
+
+def _solve_many(chunk, config, cache, width):
+    """ Solve a chunk of puzzles with the batched genetic algorithm, looking them up in the cache first. """
+    from multipuzzle import solve_many
+
+    records = []
+    givens = {}
+
+    def puzzles():
+        for name, puzzle in chunk:
+            start = time.time()
+            try:
+                given = Given(_values(puzzle))
+            except ValueError as e:
+                records.append({"name": name, "solved": False, "error": str(e), "elapsed": time.time() - start})
+                continue
+            if (cache is not None):
+                solution = cache.get(given)
+                if (solution is not None):
+                    result = SolverResult.from_cache(solution, start)
+                    records.append(dict(_record(name, result), elapsed=result.elapsed))
+                    continue
+            givens[name] = given
+            yield name, given
+
+    for name, result in solve_many(puzzles(), config, width):
+        if (hasattr(result, "error")):
+            records.append({"name": name, "solved": False, "error": result.error, "elapsed": result.elapsed})
+            continue
+        if (cache is not None and result.solved):
+            cache.put(givens[name], result.solution)
+        givens.pop(name, None)
+        records.append(dict(_record(name, result), elapsed=result.elapsed))
+    return records
+
+
+def _values(puzzle):
+    """ The values of a puzzle as yielded by read_puzzles. """
+    if (isinstance(puzzle, str)):
+        return parse_line(puzzle)
+    if (isinstance(puzzle, tuple)):
+        bank, index = puzzle
+        return bank[index]
+    if (isinstance(puzzle, ValueError)):
+        raise puzzle
+    return puzzle
+
+
+def pack(puzzles, path, block=4096, skipped=None):
+    """ Write a stream of (name, puzzle) pairs, as yielded by read_puzzles, to a puzzle bank (see puzzles.write_bank). Runs of lines are parsed in blocks of block lines at once (see puzzles.parse_lines), and line by line only if a block holds a malformed one. Malformed puzzles, and those whose size differs from that of the first one, are left out of the bank rather than stopping it, and passed to skipped (a function of their name and of the error message) if it is given. Returns the number of puzzles written. """
+    def parsed(names, lines):
+        try:
+            grids = parse_lines(lines)
+        except ValueError:
+            grids = None
+        for k, name in enumerate(names):
+            if (grids is not None):
+                yield name, grids[k]
+                continue
+            try:
+                yield name, parse_lines([lines[k]])[0]
+            except ValueError as e:
+                if (skipped is not None):
+                    skipped(name, str(e))
+
+    def named_grids():
+        names = []
+        lines = []
+        for name, puzzle in puzzles:
+            if (isinstance(puzzle, str)):
+                names.append(name)
+                lines.append(puzzle)
+                if (len(lines) < block):
+                    continue
+            for item in parsed(names, lines):
+                yield item
+            names = []
+            lines = []
+            if (isinstance(puzzle, str)):
+                continue
+            try:
+                values = _values(puzzle)
+            except ValueError as e:
+                if (skipped is not None):
+                    skipped(name, str(e))
+                continue
+            yield name, values
+        for item in parsed(names, lines):
+            yield item
+
+    def grids():
+        Nd = None
+        for name, values in named_grids():
+            if (Nd is None):
+                Nd = len(values)
+            if (values.shape != (Nd, Nd)):
+                if (skipped is not None):
+                    skipped(name, "Expected a %d x %d grid like the first puzzle, got shape %s." % (Nd, Nd, values.shape))
+                continue
+            yield values
+
+    return write_bank(path, grids())
+
+
+def _chunks(puzzles, size):
+    chunk = []
+    for puzzle in puzzles:
+        chunk.append(puzzle)
+        if (len(chunk) == size):
+            yield chunk
+            chunk = []
+    if (len(chunk) > 0):
+        yield chunk
+
+
+def solve_batch(puzzles, config=None, workers=None, chunk_size=32, max_pending=None, cache_path=None, width=0):
+    """ Solve a stream of (name, puzzle) pairs over a pool of worker processes, yielding one record (a dict) per puzzle as soon as its chunk is finished; records therefore come out in completion order rather than input order.
+
+    Puzzles are sent to the workers in chunks of chunk_size, to amortize the inter-process overhead, and at most max_pending chunks (twice the number of workers by default) are in flight at any time, so that memory stays bounded however long the input is. If cache_path is given, the workers share the solution cache database at that path (see cache.SolutionCache). If width is positive, each worker evolves up to width puzzles of its chunk at once with the batched genetic algorithm (see multipuzzle.solve_many), which raises throughput for bulk jobs; chunks should then hold several times width puzzles.
+    """
+    if (config is None):
+        config = SolverConfig()
+    if (workers is None):
+        workers = os.cpu_count() or 1
+    if (max_pending is None):
+        max_pending = 2*workers
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in _chunks(puzzles, chunk_size):
+            if (len(pending) >= max_pending):
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    for record in future.result():
+                        yield record
+            pending.add(pool.submit(_solve_chunk, chunk, config, cache_path, width))
+
+        for future in concurrent.futures.as_completed(pending):
+            for record in future.result():
+                yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve many Sudoku puzzles, writing one JSON record per puzzle as soon as it is solved.")
+    parser.add_argument("sources", nargs="+", help="directories, glob patterns, puzzle files or one-puzzle-per-line files ('-' for standard input)")
+    parser.add_argument("-o", "--output", default="-", help="the JSON-lines file to write the results to (standard output by default)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=None, help="the solver backend to use (exact by default, genetic with --batched)")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (one per core by default)")
+    parser.add_argument("--chunk-size", type=int, default=32, help="number of puzzles sent to a worker at a time")
+    parser.add_argument("--population", type=int, default=500, help="population size of the genetic algorithm")
+    parser.add_argument("--generations", type=int, default=500, help="maximum number of generations of the genetic algorithm")
+    parser.add_argument("--local-search", type=int, default=0, help="min-conflicts steps applied to each elite every generation (memetic mode)")
+    parser.add_argument("--cache", default=None, help="a solution cache database shared by the workers, so that repeated and equivalent puzzles are only solved once")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random number generators (every puzzle is solved with the same seed)")
+    parser.add_argument("--batched", type=int, default=0, metavar="WIDTH", help="evolve up to WIDTH puzzles at once in each worker with the batched genetic algorithm (genetic backend only, without local search)")
+    parser.add_argument("--route-log", default=None, help="write the routing decisions of the auto backend to this JSON-lines file")
+    parser.add_argument("--pack", default=None, help="write the puzzles to this puzzle bank instead of solving them")
+    args = parser.parse_args()
+    if (args.route_log is not None and args.backend != "auto"):
+        parser.error("--route-log needs --backend auto")
+    if (args.batched > 0 and args.backend not in (None, "genetic")):
+        parser.error("--batched only runs the genetic backend")
+    if (args.batched > 0 and args.local_search > 0):
+        parser.error("--batched does not support --local-search")
+    if (args.backend is None):
+        args.backend = "genetic" if args.batched > 0 else "exact"
+
+    if (args.pack is not None):
+        start = time.time()
+        skipped = []
+
+        def skip(name, error):
+            skipped.append(name)
+            print("Skipped %s: %s" % (name, error), file=sys.stderr)
+
+        count = pack(read_puzzles(args.sources), args.pack, skipped=skip)
+        print("Packed %d puzzles into %s in %.2f sec (%d skipped)." % (count, args.pack, time.time() - start, len(skipped)), file=sys.stderr)
+        return
+
+    config = SolverConfig(Nc=args.population, Ng=args.generations, backend=args.backend, seed=args.seed, local_search=args.local_search)
+    chunk_size = max(args.chunk_size, 4*args.batched)  # Enough puzzles to refill the slots as they are solved.
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    route_log = open(args.route_log, "w") if args.route_log is not None else None
+    start = time.time()
+    count = 0
+    solved = 0
+    cached = 0
+    routes = {}
+    try:
+        for record in solve_batch(read_puzzles(args.sources), config, args.workers, chunk_size, cache_path=args.cache, width=args.batched):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            count += 1
+            solved += record["solved"]
+            cached += record.get("cached", False)
+            if ("route" in record):
+                routes[record["route"]] = routes.get(record["route"], 0) + 1
+                if (route_log is not None):
+                    route_log.write(json.dumps({"event": "route", "name": record["name"], "tier": record["route"], "tried": record["tried"], "settings": record["settings"],
+                                                "features": record["features"], "solved": record["solved"], "elapsed": record["elapsed"]}) + "\n")
+    finally:
+        if (out is not sys.stdout):
+            out.close()
+        if (route_log is not None):
+            route_log.close()
+
+    elapsed = time.time() - start
+    print("Solved %d of %d puzzles in %.2f sec (%.1f puzzles/sec)." % (solved, count, elapsed, count/elapsed if elapsed > 0 else 0.0), file=sys.stderr)
+    if (args.cache is not None):
+        print("Cache: %d hits, %d misses." % (cached, count - cached), file=sys.stderr)
+    if (len(routes) > 0):
+        print("Routes: %s." % ", ".join("%d to %s" % (routes[tier], tier) for tier in AutoBackend.TIERS if tier in routes), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy
+
+from Sudoku import Given, SolverConfig, Sudoku, restart_policy, solve
+
+PERCENTILES = (50, 95, 99)
+
+
+def make_config(kwargs, seed=None):
+    """ The SolverConfig of a configuration to benchmark. Besides the arguments of SolverConfig, the settings can hold the name of a restart policy as restart (see restart_policy) and its budget as budget_seconds and budget_evaluations. """
+    kwargs = dict(kwargs)
+    seconds = kwargs.pop("budget_seconds", None)
+    evaluations = kwargs.pop("budget_evaluations", None)
+    name = kwargs.pop("restart", "stale")
+    kwargs["restart"] = restart_policy(name, kwargs.get("stale_limit", 50), evaluations, seconds)
+    return SolverConfig(seed=seed, **kwargs)
+
+
+def parse_config(text):
+    """ Parse a configuration to benchmark, written as "name:key=value,key=value", e.g. "small:Nc=200,backend=genetic". The keys are the arguments of SolverConfig (see also make_config); values are read as numbers where possible. Returns the (name, keyword arguments) pair. """
+    name, _, settings = text.partition(":")
+    kwargs = {}
+    for setting in settings.split(","):
+        if (setting.strip() == ""):
+            continue
+        key, _, value = setting.partition("=")
+        for kind in (int, float):
+            try:
+                value = kind(value)
+                break
+            except ValueError:
+                pass
+        if (value in ("True", "False", "None")):
+            value = {"True": True, "False": False, "None": None}[value]
+        kwargs[key.strip()] = value
+    make_config(kwargs)  # Fail early on unknown keys.
+    return name, kwargs
+
+
+def run_once(given, config):
+    """ Solve a puzzle once, returning the record of the run. """
+    start = time.time()
+    result = solve(Given(given.values), config)
+    elapsed = time.time() - start
+    return {"seed": config.seed,
+            "solved": result.solved,
+            "elapsed": elapsed,
+            "generations": result.generations,
+            "restarts": result.restarts,
+            "evaluations": result.evaluations,
+            "evaluations_per_sec": result.evaluations/elapsed if elapsed > 0 else 0.0,
+            "fitness": result.fitness}
+
+
+def summarise(runs):
+    """ Summarise the runs of one configuration on one puzzle. Time-to-solution percentiles count an unsolved run as taking forever, since the heavy tail is what matters; a percentile that falls on an unsolved run is reported as None. """
+    times = numpy.array([r["elapsed"] if r["solved"] else numpy.inf for r in runs])
+    summary = {"runs": len(runs),
+               "success_rate": sum(r["solved"] for r in runs)/len(runs),
+               "mean_generations": float(numpy.mean([r["generations"] for r in runs])),
+               "mean_restarts": float(numpy.mean([r["restarts"] for r in runs])),
+               "evaluations_per_sec": float(numpy.median([r["evaluations_per_sec"] for r in runs]))}
+    for p in PERCENTILES:
+        # No interpolation, so that the percentile is always the time of an actual run.
+        t = float(numpy.percentile(times, p, method="inverted_cdf"))
+        summary["p%d" % p] = t if numpy.isfinite(t) else None
+    return summary
+
+
+def benchmark(paths, configs, seeds, first_seed=0, progress=None):
+    """ Run every configuration on every puzzle file, once for each of the seeds first_seed, first_seed+1, ... Configurations are given as (name, keyword arguments of SolverConfig) pairs. progress, if given, is called with (name, path, record) after each run.
+
+    Returns a dict holding, for each configuration, the runs and summary of each puzzle.
+    """
+    report = {}
+    for name, kwargs in configs:
+        report[name] = {"config": kwargs, "instances": {}}
+        for path in paths:
+            s = Sudoku()
+            s.load(path)
+            runs = []
+            for seed in range(first_seed, first_seed+seeds):
+                config = make_config(kwargs, seed)
+                record = run_once(s.given, config)
+                runs.append(record)
+                if (progress is not None):
+                    progress(name, path, record)
+            report[name]["instances"][path] = {"summary": summarise(runs), "runs": runs}
+    return report
+
+
+def _format_time(t):
+    return "%8.3f" % t if t is not None else "     inf"
+
+
+def print_report(report, out=sys.stdout):
+    """ Print the summaries of a report as a table, with the configurations side by side for each puzzle. When several configurations are compared, the ratio of each median to that of the first configuration is shown as well. """
+    names = list(report.keys())
+    paths = list(report[names[0]]["instances"].keys())
+    print("%-28s %-12s %7s %8s %8s %8s %7s %8s %10s" % ("instance", "config", "success", "p50", "p95", "p99", "gens", "restarts", "evals/sec"), file=out)
+    for path in paths:
+        baseline = report[names[0]]["instances"][path]["summary"]["p50"]
+        for name in names:
+            summary = report[name]["instances"][path]["summary"]
+            line = "%-28s %-12s %6.0f%% %s %s %s %7.1f %8.2f %10.0f" % (
+                os.path.basename(path), name, 100*summary["success_rate"], _format_time(summary["p50"]), _format_time(summary["p95"]), _format_time(summary["p99"]),
+                summary["mean_generations"], summary["mean_restarts"], summary["evaluations_per_sec"])
+            if (name != names[0] and baseline and summary["p50"] is not None):
+                line += "   x%.2f" % (summary["p50"]/baseline)
+            print(line, file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the solver over the bundled instances, reporting the distribution of the time to solution over many seeds.")
+    parser.add_argument("instances", nargs="*", default=["instances"], help="puzzle files or directories of puzzle files (instances/ by default)")
+    parser.add_argument("-c", "--config", action="append", type=parse_config, help="a configuration to benchmark, as name:key=value,... with the arguments of SolverConfig (repeat to compare several)")
+    parser.add_argument("-n", "--seeds", type=int, default=20, help="number of seeded runs per instance and configuration")
+    parser.add_argument("--first-seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("-o", "--output", default=None, help="the JSON file to write the full report to")
+    args = parser.parse_args()
+
+    paths = []
+    for source in args.instances:
+        paths.extend(sorted(glob.glob(os.path.join(source, "*.txt"))) if os.path.isdir(source) else [source])
+    configs = args.config or [("default", {})]
+
+    def progress(name, path, record):
+        print("%s %s seed %d: %s in %.3f sec" % (name, os.path.basename(path), record["seed"], "solved" if record["solved"] else "unsolved", record["elapsed"]), file=sys.stderr)
+
+    report = benchmark(paths, configs, args.seeds, args.first_seed, progress)
+    print_report(report)
+    if (args.output is not None):
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import collections
+import itertools
+import sqlite3
+import time
+
+import numpy
+
+from Sudoku import Board, Candidate
+
+
+class Transform(object):
+    """ A symmetry of the Sudoku grid: an optional transposition, followed by a reordering of the rows and of the columns (bands and rows within bands, stacks and columns within stacks), followed by a relabelling of the values. digits[v] is the new label of the value v (with digits[0] = 0 for blank cells). """
+
+    def __init__(self, transpose, rows, columns, digits):
+        self.transpose = transpose
+        self.rows = rows
+        self.columns = columns
+        self.digits = digits
+        return
+
+    def apply(self, values):
+        values = numpy.asarray(values)
+        if (self.transpose):
+            values = values.T
+        return self.digits[values[numpy.ix_(self.rows, self.columns)]]
+
+    def invert(self, values):
+        inverse = numpy.argsort(self.digits)
+        grid = numpy.empty_like(numpy.asarray(values))
+        grid[numpy.ix_(self.rows, self.columns)] = inverse[numpy.asarray(values)]
+        if (self.transpose):
+            grid = grid.T
+        return grid
+
+
+def _rank(keys):
+    """ Replace each key by its rank among the distinct keys, which keeps the keys small without depending on the order of the lines. """
+    distinct = sorted(set(keys))
+    return [distinct.index(key) for key in keys]
+
+
+def _signatures(values, rounds=2):
+    """ Signatures of the rows, columns and values of a grid that do not depend on the order of the rows and columns or on the labels of the values, refined over a few rounds from the number of givens of each (in the manner of colour refinement). """
+    Nd = len(values)
+    rows, columns = numpy.nonzero(values)
+    digits = values[rows, columns] - 1
+    row_keys = _rank(numpy.bincount(rows, minlength=Nd).tolist())
+    column_keys = _rank(numpy.bincount(columns, minlength=Nd).tolist())
+    digit_keys = _rank(numpy.bincount(digits, minlength=Nd).tolist())
+    for r in range(0, rounds):
+        cells = list(zip(rows.tolist(), columns.tolist(), digits.tolist()))
+        row_keys, column_keys, digit_keys = (
+            _rank([(row_keys[i], tuple(sorted((column_keys[j], digit_keys[d]) for (k, j, d) in cells if k == i))) for i in range(0, Nd)]),
+            _rank([(column_keys[j], tuple(sorted((row_keys[i], digit_keys[d]) for (i, k, d) in cells if k == j))) for j in range(0, Nd)]),
+            _rank([(digit_keys[d], tuple(sorted((row_keys[i], column_keys[j]) for (i, j, k) in cells if k == d))) for d in range(0, Nd)]))
+    return row_keys, column_keys
+
+
+def _product(factories):
+    """ Like itertools.product, but lazy: factories are functions returning a new iterator over each factor, so that nothing is generated before it is needed. """
+    if (len(factories) == 0):
+        yield ()
+        return
+    for first in factories[0]():
+        for rest in _product(factories[1:]):
+            yield (first,) + rest
+
+
+def _ties(items, key):
+    """ The orders of a sorted list of items in which each run of items with the same key is permuted, as lists. """
+    runs = [list(group) for k, group in itertools.groupby(items, key)]
+    for order in _product([lambda run=run: itertools.permutations(run) for run in runs]):
+        yield [item for run in order for item in run]
+
+
+def _arrangements(keys, box):
+    """ The orders of the lines (rows or columns) of a grid allowed by its structure, with bands (groups of box lines) sorted by the sorted keys of their lines and the lines of each band sorted by their keys. Lines or bands with the same keys can go in any order, so every such arrangement is generated, lazily. """
+    bands = [sorted(range(b*box, (b+1)*box), key=lambda line: keys[line]) for b in range(0, box)]
+    bands.sort(key=lambda band: [keys[line] for line in band])
+
+    for band_order in _ties(bands, lambda band: [keys[line] for line in band]):
+        for line_orders in _product([lambda band=band: _ties(band, lambda line: keys[line]) for band in band_order]):
+            yield [line for band in line_orders for line in band]
+
+
+def _relabel(values):
+    """ The relabelling of the values of a grid in the order of their first occurrence (reading row by row), with the values that do not occur at all labelled last. """
+    Nd = len(values)
+    flat = values.ravel()
+    given = flat[flat > 0]
+    distinct, first = numpy.unique(given, return_index=True)
+    order = list(distinct[numpy.argsort(first)]) + [v for v in range(1, Nd+1) if v not in distinct]
+    digits = numpy.zeros(Nd+1, dtype=values.dtype)
+    digits[order] = numpy.arange(1, Nd+1)
+    return digits
+
+
+def canonical_form(values, box=None, budget=256):
+    """ A canonical form of a puzzle, such that puzzles that are equivalent under the symmetries of the grid (transposition, reordering of bands, of rows within a band, of stacks and of columns within a stack, and relabelling of the values) usually get the same form. Returns the (key, Transform) pair, where the Transform maps the puzzle onto its canonical grid and the key is a string of that grid.
+
+    The rows and columns are ordered by signatures that do not depend on the arrangement of the grid, and any lines that these leave tied are tried in every order, keeping the lexicographically smallest relabelled grid. For highly symmetric puzzles with more than budget tied arrangements only the first ones are tried, so that equivalent puzzles may then get different keys; the same puzzle always gets the same key.
+    """
+    values = numpy.asarray(values, dtype=int)
+    board = Board.of_size(len(values)) if box is None else Board.of_box(box)
+    best = None
+    for transpose in (False, True):
+        grid = values.T if transpose else values
+        row_keys, column_keys = _signatures(grid)
+        row_orders = list(itertools.islice(_arrangements(row_keys, board.box), budget))
+        column_orders = list(itertools.islice(_arrangements(column_keys, board.box), budget))
+        for rows, columns in itertools.islice(itertools.product(row_orders, column_orders), budget):
+            arranged = grid[numpy.ix_(rows, columns)]
+            digits = _relabel(arranged)
+            form = digits[arranged].ravel().tolist()
+            if (best is None or form < best[0]):
+                best = (form, Transform(transpose, numpy.array(rows), numpy.array(columns), digits))
+
+    form, transform = best
+    key = "%d:%s" % (board.box, ",".join(str(v) for v in form))
+    return key, transform
+
+
+class SolutionCache(object):
+    """ A cache of solutions, keyed by the canonical form of the puzzle (see canonical_form), so that a puzzle that is the same as, or equivalent to, one that was solved before is answered without solving it again.
+
+    Solutions are kept in an in-memory LRU of up to capacity entries and, if a path is given, in an SQLite database of up to max_entries entries, from which the least recently used are evicted. A hit is mapped back through the inverse of the puzzle's symmetry and checked against the puzzle before it is returned. hits and misses count the lookups; disk_hits counts the hits that had to go to the database.
+    """
+
+    def __init__(self, path=None, capacity=1024, max_entries=100000):
+        self.capacity = capacity
+        self.max_entries = max_entries
+        self.memory = collections.OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.db = None
+        if (path is not None):
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, solution TEXT NOT NULL, used REAL NOT NULL)")
+            self.db.commit()
+        return
+
+    def close(self):
+        if (self.db is not None):
+            self.db.close()
+            self.db = None
+        return
+
+    def remember(self, key, solution):
+        """ Put a canonical solution (a string) in the in-memory LRU. """
+        self.memory[key] = solution
+        self.memory.move_to_end(key)
+        while (len(self.memory) > self.capacity):
+            self.memory.popitem(last=False)
+        return
+
+    def get(self, given):
+        """ The cached solution of a puzzle (a Given) as a Candidate, or None. """
+        key, transform = canonical_form(given.values, given.board.box)
+        solution = self.memory.get(key)
+        if (solution is not None):
+            self.memory.move_to_end(key)
+        elif (self.db is not None):
+            row = self.db.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+            if (row is not None):
+                solution = row[0]
+                self.db.execute("UPDATE solutions SET used = ? WHERE key = ?", (time.time(), key))
+                self.db.commit()
+                self.remember(key, solution)
+                self.disk_hits += 1
+
+        if (solution is not None):
+            Nd = given.Nd
+            candidate = Candidate(Nd)
+            candidate.values = transform.invert(numpy.array(solution.split(","), dtype=int).reshape(Nd, Nd))
+            if (given.accepts(candidate)):
+                candidate.update_fitness()
+                self.hits += 1
+                return candidate
+        self.misses += 1
+        return None
+
+    def put(self, given, solution):
+        """ Cache the solution (a Candidate) of a puzzle (a Given). """
+        key, transform = canonical_form(given.values, given.board.box)
+        text = ",".join(str(v) for v in transform.apply(solution.values).ravel().tolist())
+        self.remember(key, text)
+        if (self.db is not None):
+            self.db.execute("INSERT OR REPLACE INTO solutions (key, solution, used) VALUES (?, ?, ?)", (key, text, time.time()))
+            count = self.db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+            if (count > self.max_entries):
+                self.db.execute("DELETE FROM solutions WHERE key IN (SELECT key FROM solutions ORDER BY used LIMIT ?)", (count - self.max_entries,))
+            self.db.commit()
+        return
@@ -0,0 +1,201 @@
+import os
+
+import numpy
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def histograms(counts):
+    """ Compute the histograms and numbers of distinct counts for a whole batch of (Nc, Nd, Nd) counts in one pass. """
+    Nc, Nd = counts.shape[0], counts.shape[1]
+    offsets = numpy.arange(Nc*Nd).reshape(Nc, Nd, 1) * (Nd+1)
+    histogram = numpy.bincount((offsets + counts).ravel(), minlength=Nc*Nd*(Nd+1)).reshape(Nc, Nd, Nd+1)
+    distinct = numpy.count_nonzero(histogram, axis=2)
+    return histogram, distinct
+
+
+def _sum_by_index(index, delta):
+    """ Add up the deltas of equal indices, returning the distinct indices (in increasing order) and the sum of the deltas of each. Sorting the indices makes repeated ones safe to update with plain fancy indexing, which is much faster than numpy.add.at. """
+    if (len(index) == 0):
+        return index, delta
+    order = numpy.argsort(index, kind="stable")
+    index = index[order]
+    first = numpy.flatnonzero(numpy.concatenate(([True], index[1:] != index[:-1])))
+    return index[first], numpy.add.reduceat(delta[order], first)
+
+
+def move_cells_reference(values, column_counts, column_histogram, column_distinct, block_counts, block_histogram, block_distinct, blocks, slots, rows, columns, new):
+    """ Set the cells (slots[k], rows[k], columns[k]) of a population buffer to the values new[k], updating the column and block counts, histograms and numbers of distinct counts of the candidates. A cell must not appear twice.
+
+    As _move_cells_loops does cell by cell, only the bins that the moves touch are updated: the counts of the old and new values in each unit, the histogram bins of those counts, and the numbers of distinct counts of those units. Several moves may touch the same bin, so the changes to each level are first added up by bin (see _sum_by_index).
+    """
+    old = values[slots, rows, columns].astype(numpy.intp) - 1
+    values[slots, rows, columns] = new
+    changed = old != new.astype(numpy.intp) - 1
+    if (not numpy.any(changed)):
+        return
+    slots = slots[changed]
+    rows = rows[changed]
+    columns = columns[changed]
+    old = old[changed]
+    new = new[changed].astype(numpy.intp) - 1
+
+    Nd = values.shape[1]
+    signs = numpy.repeat(numpy.array([-1, 1], dtype=numpy.intp), len(slots))
+    for counts, histogram, distinct, unit in ((column_counts, column_histogram, column_distinct, columns), (block_counts, block_histogram, block_distinct, blocks[rows, columns])):
+        # Move every number out of its unit and the new one in.
+        first = (slots*Nd + unit)*Nd
+        bins, delta = _sum_by_index(numpy.concatenate((first + old, first + new)), signs)
+        bins = bins[delta != 0]
+        delta = delta[delta != 0]
+        flat = counts.reshape(-1)
+        before = flat[bins].astype(numpy.intp)
+        after = before + delta
+        flat[bins] = after
+
+        # Move each count that changed from its old bin of the unit's histogram to its new one.
+        units = (bins // Nd)*(Nd+1)
+        places, delta = _sum_by_index(numpy.concatenate((units + before, units + after)), numpy.repeat(numpy.array([-1, 1], dtype=numpy.intp), len(bins)))
+        flat = histogram.reshape(-1)
+        was = flat[places].astype(numpy.intp)
+        now = was + delta
+        flat[places] = now
+
+        # Count the bins that became empty or stopped being empty.
+        units, delta = _sum_by_index(places // (Nd+1), (now > 0).astype(numpy.intp) - (was > 0))
+        distinct.reshape(-1)[units] += delta.astype(distinct.dtype)
+    return
+
+
+def unit_fitness_reference(column_distinct, block_distinct, slots):
+    """ The fitness of the candidates in the given slots from their numbers of distinct counts, exactly as Sudoku.Candidate.refresh_fitness computes it (the sums are accumulated unit by unit in the same order). """
+    Nd = column_distinct.shape[1]
+    columns = column_distinct[slots].astype(numpy.float64)
+    blocks = block_distinct[slots].astype(numpy.float64)
+    column_sum = numpy.zeros(len(slots))
+    block_sum = numpy.zeros(len(slots))
+    for u in range(0, Nd):
+        column_sum += (1.0/columns[:, u])/Nd
+        block_sum += (1.0/blocks[:, u])/Nd
+    return numpy.where((numpy.trunc(column_sum) == 1) & (numpy.trunc(block_sum) == 1), 1.0, column_sum * block_sum)
+
+
+def odd_cycles_reference(rows1, rows2):
+    """ The (M, Nd) mask of the places of a batch of pairs of rows that belong to odd cycles (see Sudoku.CycleCrossover.odd_cycles). Rather than following each cycle with searches, every place is labelled with the first place of its cycle by pointer doubling over the permutation, using the position-of-value inverse of rows1. """
+    M, Nd = rows1.shape
+    places = numpy.arange(Nd)
+    position = numpy.empty((M, Nd+1), dtype=numpy.intp)  # Position of each value in rows1.
+    position[numpy.arange(M)[:, numpy.newaxis], rows1] = places
+    step = numpy.take_along_axis(position, rows2.astype(numpy.intp), axis=1)  # The next place in the cycle.
+
+    label = numpy.broadcast_to(places, (M, Nd)).copy()
+    reach = 1
+    while (reach < Nd):
+        label = numpy.minimum(label, numpy.take_along_axis(label, step, axis=1))
+        step = numpy.take_along_axis(step, step, axis=1)
+        reach *= 2
+
+    # Number the cycles by their first place.
+    first = (label == places)
+    number = numpy.cumsum(first, axis=1) - 1
+    return (numpy.take_along_axis(number, label, axis=1) % 2) == 1
+
+
+def _change(counts, histogram, distinct, slot, unit, index, delta):
+    # Change one count of a unit, keeping its histogram and number of distinct counts up to date (see Sudoku.UnitCounts.change).
+    count = int(counts[slot, unit, index])
+    histogram[slot, unit, count] -= 1
+    if (histogram[slot, unit, count] == 0):
+        distinct[slot, unit] -= 1
+    count += delta
+    counts[slot, unit, index] = count
+    if (histogram[slot, unit, count] == 0):
+        distinct[slot, unit] += 1
+    histogram[slot, unit, count] += 1
+
+
+def _move_cells_loops(values, column_counts, column_histogram, column_distinct, block_counts, block_histogram, block_distinct, blocks, slots, rows, columns, new):
+    for k in range(len(slots)):
+        slot = slots[k]
+        row = rows[k]
+        column = columns[k]
+        old = int(values[slot, row, column])
+        value = int(new[k])
+        if (old == value):
+            continue
+        values[slot, row, column] = value
+        block = blocks[row, column]
+        _change(column_counts, column_histogram, column_distinct, slot, column, old-1, -1)
+        _change(column_counts, column_histogram, column_distinct, slot, column, value-1, 1)
+        _change(block_counts, block_histogram, block_distinct, slot, block, old-1, -1)
+        _change(block_counts, block_histogram, block_distinct, slot, block, value-1, 1)
+
+
+def _unit_fitness_loops(column_distinct, block_distinct, slots):
+    Nd = column_distinct.shape[1]
+    fitness = numpy.empty(len(slots))
+    for k in range(len(slots)):
+        column_sum = 0.0
+        block_sum = 0.0
+        for u in range(Nd):
+            column_sum += (1.0/column_distinct[slots[k], u])/Nd
+            block_sum += (1.0/block_distinct[slots[k], u])/Nd
+        if (int(column_sum) == 1 and int(block_sum) == 1):
+            fitness[k] = 1.0
+        else:
+            fitness[k] = column_sum * block_sum
+    return fitness
+
+
+def _odd_cycles_loops(rows1, rows2):
+    M, Nd = rows1.shape
+    flip = numpy.zeros((M, Nd), dtype=numpy.bool_)
+    position = numpy.empty(Nd+1, dtype=numpy.intp)
+    seen = numpy.empty(Nd, dtype=numpy.bool_)
+    for m in range(M):
+        for i in range(Nd):
+            position[rows1[m, i]] = i
+            seen[i] = False
+        cycle = 0
+        for start in range(Nd):
+            if (seen[start]):
+                continue
+            i = start
+            while (True):
+                seen[i] = True
+                flip[m, i] = (cycle % 2 == 1)
+                i = position[rows2[m, i]]
+                if (i == start):
+                    break
+            cycle += 1
+    return flip
+
+
+# The kernels used by the solver: compiled when Numba is installed (unless the environment variable SUDOKU_KERNELS is set to "reference"), the NumPy reference ones otherwise. The loops above are written in the subset of Python that Numba compiles, and neither kind of kernel draws random numbers, so a seeded run gives the same results with either.
+ACCELERATED = numba is not None and os.environ.get("SUDOKU_KERNELS", "") != "reference"
+
+if (numba is not None):
+    _change = numba.njit(cache=True)(_change)
+    move_cells_compiled = numba.njit(cache=True)(_move_cells_loops)
+    unit_fitness_compiled = numba.njit(cache=True)(_unit_fitness_loops)
+    odd_cycles_compiled = numba.njit(cache=True)(_odd_cycles_loops)
+else:
+    move_cells_compiled = None
+    unit_fitness_compiled = None
+    odd_cycles_compiled = None
+
+if (ACCELERATED):
+    move_cells = move_cells_compiled
+    unit_fitness = unit_fitness_compiled
+    odd_cycles = odd_cycles_compiled
+else:
+    move_cells = move_cells_reference
+    unit_fitness = unit_fitness_reference
+    odd_cycles = odd_cycles_reference
+
+
+if __name__ == "__main__":
+    print("Numba %s; using the %s kernels." % ("is installed" if numba is not None else "is not installed", "compiled" if ACCELERATED else "reference"))
@@ -0,0 +1,145 @@
+import json
+import time
+
+import numpy
+
+from Sudoku import Observer
+
+
+class MemorySink(object):
+    """ Keeps the records in a list. """
+
+    def __init__(self):
+        self.records = []
+        return
+
+    def write(self, record):
+        self.records.append(record)
+        return
+
+    def flush(self):
+        return
+
+    def close(self):
+        return
+
+
+class JsonLinesSink(object):
+    """ Writes each record as a line of JSON to a file, given either as a path or as an open file (which is then left open). """
+
+    def __init__(self, file):
+        self.owned = isinstance(file, str)
+        self.file = open(file, "w") if self.owned else file
+        return
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        return
+
+    def flush(self):
+        self.file.flush()
+        return
+
+    def close(self):
+        if (self.owned):
+            self.file.close()
+        else:
+            self.file.flush()
+        return
+
+
+class CallbackSink(object):
+    """ Passes each record to a function. """
+
+    def __init__(self, callback):
+        self.callback = callback
+        return
+
+    def write(self, record):
+        self.callback(record)
+        return
+
+    def flush(self):
+        return
+
+    def close(self):
+        return
+
+
+class MetricsObserver(Observer):
+    """ Records the progress of a solver run as a stream of records (dicts), written to one or more sinks (see MemorySink, JsonLinesSink and CallbackSink).
+
+    Every sample_every generations, a "generation" record gives the best and mean fitness and the diversity of the population, the state of the adaptive mutation (rate, sigma, successful and improving mutations), the stale counter, the restarts and evaluations so far, and the seconds spent in each phase (selection, crossover, mutation, fitness, ...) of the last generation. Restarts are recorded as "seeded" records and the end of the run as a "finished" record. Computing a record costs about as much as a generation, so sampling keeps the overhead negligible.
+
+    One observer can follow several runs in turn: the sinks are only flushed at the end of each run, and closed by close() (or by leaving a with block) once the caller is done with them.
+    """
+
+    def __init__(self, *sinks, sample_every=1):
+        self.sinks = list(sinks) if len(sinks) > 0 else [MemorySink()]
+        self.sample_every = max(1, sample_every)
+        self.start = None
+        return
+
+    @property
+    def records(self):
+        """ The records of the first in-memory sink. """
+        for sink in self.sinks:
+            if (isinstance(sink, MemorySink)):
+                return sink.records
+        return None
+
+    def emit(self, record):
+        record["time"] = time.time() - self.start if self.start is not None else 0.0
+        for sink in self.sinks:
+            sink.write(record)
+        return
+
+    def on_seeded(self, ga):
+        if (self.start is None):
+            self.start = time.time()
+        self.emit({"event": "seeded", "generation": ga.generation, "restarts": ga.restarts})
+        return
+
+    def on_generation(self, ga, best):
+        if (ga.generation % self.sample_every != 0):
+            return
+        fitness = ga.population.fitness
+        self.emit({"event": "generation",
+                   "generation": ga.generation,
+                   "best": best.fitness,
+                   "mean": float(numpy.mean(fitness)),
+                   "diversity": ga.population.diversity(),
+                   "mutation_rate": ga.mutation_rate,
+                   "sigma": ga.sigma,
+                   "mutations": ga.mutations,
+                   "improvements": ga.improvements,
+                   "stale": ga.stale,
+                   "restarts": ga.restarts,
+                   "evaluations": ga.evaluations,
+                   "timings": dict(ga.timings)})
+        return
+
+    def on_finished(self, result):
+        self.emit({"event": "finished",
+                   "solved": result.solved,
+                   "fitness": result.fitness,
+                   "generations": result.generations,
+                   "restarts": result.restarts,
+                   "evaluations": result.evaluations,
+                   "elapsed": result.elapsed})
+        for sink in self.sinks:
+            sink.flush()
+        self.start = None  # The times of the next run start from its own seeding.
+        return
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+        return False
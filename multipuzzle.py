@@ -0,0 +1,206 @@
+import time
+
+import numpy
+
+from Sudoku import CycleCrossover, Population, PopulationBuffer, SolverConfig, SolverResult, SwapTable, Tournament, solve_genetic
+
+
+class MultiPuzzleGA(object):
+    """ The genetic algorithm on width puzzles of the same size at once, for throughput rather than latency.
+
+    The populations of all the puzzles live in a single pair of PopulationBuffers of width*Nc candidates, i.e. a (width, Nc, Nd, Nd) tensor of genes with the puzzles along the first axis, and the tables that mutation needs (see SwapTable) are stacked along the same axis. Each generation then runs elite selection, tournaments, crossover, mutation and fitness as one array operation over all the puzzles in play (see evolve), so that the per-generation overhead of Python is shared between them. Every puzzle keeps its own generation count, adaptive mutation rate and stale counter, and is re-seeded on its own when it stagnates (as StaleRestart does).
+
+    A puzzle is put in a free slot with load() and taken out with retire(), so that slots can be refilled as soon as their puzzle is solved (see solve_many). All random numbers come from the numpy Generator rng, shared by all the slots.
+    """
+
+    def __init__(self, width, Nd, config=None, rng=None):
+        self.config = config if config is not None else SolverConfig()
+        self.rng = rng if rng is not None else numpy.random.default_rng(numpy.random.SeedSequence(self.config.seed))
+        self.width = width
+        self.Nd = Nd
+        self.Nc = self.config.Nc
+        self.Ne = self.config.Ne
+        self.current = PopulationBuffer(width*self.Nc, Nd)
+        self.spare = PopulationBuffer(width*self.Nc, Nd)
+        self.seeder = Population()  # Seeds one puzzle at a time, before its candidates are copied into its slot.
+        self.tournament = Tournament(self.rng)
+        self.crossover = CycleCrossover(self.rng)
+
+        # The puzzle in each slot, and its swap pairs and domains.
+        self.givens = [None]*width
+        self.names = [None]*width
+        self.swaps = SwapTable(width, Nd)
+
+        # The state of the run of each slot.
+        self.active = numpy.zeros(width, dtype=bool)
+        self.generations = numpy.zeros(width, dtype=int)
+        self.restarts = numpy.zeros(width, dtype=int)
+        self.evaluations = numpy.zeros(width, dtype=int)
+        self.stale = numpy.zeros(width, dtype=int)
+        self.sigma = numpy.ones(width)
+        self.mutation_rate = numpy.full(width, self.config.mutation_rate)
+        self.started = numpy.zeros(width)
+        self.histories = [[] for k in range(0, width)]
+        return
+
+    def free_slots(self):
+        return numpy.flatnonzero(~self.active)
+
+    def load(self, k, name, given):
+        """ Put a puzzle (a Given of size Nd, already propagated if wanted) in the free slot k and seed its population. Raises ValueError if the puzzle has no solution. """
+        Nc = self.Nc
+        self.seeder.seed(Nc, given, self.rng, rounds=16)
+        self.current.put(self.seeder.current, numpy.arange(Nc), numpy.arange(k*Nc, (k+1)*Nc))
+        self.givens[k] = given
+        self.names[k] = name
+        self.swaps.set(k, given)
+        self.active[k] = True
+        self.generations[k] = 0
+        self.restarts[k] = 0
+        self.evaluations[k] = Nc
+        self.stale[k] = 0
+        self.sigma[k] = 1
+        self.mutation_rate[k] = self.config.mutation_rate
+        self.started[k] = time.time()
+        self.histories[k] = []
+        return
+
+    def restart(self, k):
+        """ Re-seed the population of slot k, keeping its puzzle and counters. """
+        generations, restarts, evaluations, started, history = self.generations[k], self.restarts[k], self.evaluations[k], self.started[k], self.histories[k]
+        self.load(k, self.names[k], self.givens[k])
+        self.generations[k], self.restarts[k], self.evaluations[k], self.started[k], self.histories[k] = generations, restarts + 1, evaluations + self.Nc, started, history
+        return
+
+    def best(self, k):
+        """ A copy of the fittest candidate of slot k. """
+        fitness = self.current.fitness[k*self.Nc:(k+1)*self.Nc]
+        return self.current.view(k*self.Nc + int(numpy.argmax(fitness))).copy()
+
+    def retire(self, k):
+        """ Take the puzzle out of slot k, returning its (name, SolverResult). """
+        best = self.best(k)
+        solution = best if best.fitness == 1 else None
+        result = SolverResult(solution, best, len(self.histories[k]), int(self.restarts[k]), time.time() - self.started[k], self.histories[k], int(self.evaluations[k]))
+        name = self.names[k]
+        self.active[k] = False
+        self.givens[k] = None
+        self.names[k] = None
+        return name, result
+
+    def check(self):
+        """ Record the best fitness of each puzzle in play, returning the slots whose puzzle is solved and those whose puzzle ran out of generations (config.Ng). """
+        slots = numpy.flatnonzero(self.active)
+        best = self.current.fitness.reshape(self.width, self.Nc)[slots].max(axis=1)
+        for k, fitness in zip(slots.tolist(), best.tolist()):
+            self.histories[k].append(fitness)
+        solved = slots[best == 1]
+        expired = numpy.empty(0, dtype=numpy.intp)
+        if (self.config.Ng is not None):
+            expired = slots[(best != 1) & (self.generations[slots] + 1 >= self.config.Ng)]
+        return solved, expired
+
+    def evolve(self):
+        """ Create the next generation of every puzzle in play at once, with the same operators as GeneticAlgorithm.evolve. Children go to the first Nc-Ne places of each puzzle's slot and elites to the last Ne. Returns the slots that were re-seeded because they had stagnated. """
+        Nc, Ne, Nd = self.Nc, self.Ne, self.Nd
+        slots = numpy.flatnonzero(self.active)
+        A = len(slots)
+        if (A == 0):
+            return slots
+        current = self.current
+        following = self.spare
+        base = (slots*Nc)[:, numpy.newaxis]  # The first candidate of each puzzle in play.
+        fitness = current.fitness.reshape(self.width, Nc)[slots]
+
+        # Keep the elites of every puzzle.
+        if (Ne > 0):
+            elites = numpy.argpartition(-fitness, Ne-1, axis=1)[:, 0:Ne] if Ne < Nc else numpy.broadcast_to(numpy.arange(Nc), (A, Nc))
+            following.put(current, (base + elites).ravel(), (base + numpy.arange(Nc-Ne, Nc)).ravel())
+
+        # Tournaments within each puzzle's population, and copies of the winners in the children's places.
+        parents = self.tournament.select(fitness, Nc-Ne)
+        children = (base + numpy.arange(Nc-Ne)).ravel()
+        following.put(current, (base + parents).ravel(), children)
+        following.fitness[children] = 0.0  # The children have not been evaluated yet.
+
+        # Cross over pairs of children within each puzzle, all puzzles at once.
+        count = (Nc-Ne) // 2
+        crossing = self.rng.random((A, count)) < self.config.crossover_rate
+        points = self.crossover.crossover_points(Nd, A*count).reshape(A, count, 2)
+        first_children = base + 2*numpy.arange(count)
+        self.crossover.cross_batch(following, first_children[crossing], first_children[crossing] + 1, points[crossing])
+
+        # Mutate the children, with the mutation rate of their puzzle.
+        mutating = self.rng.random((A, Nc-Ne)) < self.mutation_rate[slots][:, numpy.newaxis]
+        puzzle, place = numpy.nonzero(mutating)
+        success, _ = following.swap_random(base[puzzle, 0] + place, self.swaps, self.rng, slots[puzzle])
+
+        following.refresh_fitness(children)
+
+        # Adapt the mutation rate of each puzzle from the success of its mutations (see GeneticAlgorithm.evolve).
+        mutations = numpy.bincount(puzzle, weights=success, minlength=A)
+        improved = success & (following.fitness[base[puzzle, 0] + place] > 0.0)
+        phi = numpy.where(mutations > 0, numpy.bincount(puzzle, weights=improved, minlength=A) / numpy.maximum(mutations, 1), 0.0)
+        self.sigma[slots] = numpy.where(phi > 0.2, self.sigma[slots]/0.998, numpy.where(phi < 0.2, self.sigma[slots]*0.998, self.sigma[slots]))
+        self.mutation_rate[slots] = numpy.abs(self.rng.normal(0.0, self.sigma[slots]))
+
+        self.current, self.spare = following, current
+        self.generations[slots] += 1
+        self.evaluations[slots] += Nc-Ne
+
+        # Re-seed the puzzles whose fittest two candidates have had the same fitness for stale_limit generations.
+        top = numpy.partition(self.current.fitness.reshape(self.width, Nc)[slots], Nc-2, axis=1)[:, Nc-2:]
+        self.stale[slots] = numpy.where(top[:, 0] != top[:, 1], 0, self.stale[slots] + 1)
+        stagnant = slots[self.stale[slots] >= self.config.stale_limit]
+        for k in stagnant.tolist():
+            self.restart(k)
+        return stagnant
+
+
+def solve_many(puzzles, config=None, width=32, stop=None):
+    """ Solve a stream of (name, Given) pairs with a MultiPuzzleGA evolving up to width puzzles at once, yielding (name, SolverResult) pairs as the puzzles finish; results therefore come out in completion order rather than input order. A slot is refilled from the stream as soon as its puzzle is solved or runs out of generations.
+
+    The puzzles are propagated first if config.propagate is set, and those that propagation solves are answered without taking a slot. Puzzles whose size differs from that of the first one are solved on their own with solve_genetic. A puzzle without a solution gets a result with an error attribute. Runs are reproducible for a given config.seed, input order and width; restart policies other than the stale counter, budgets and local search are not supported in this mode. Stops early once the stop event is set, yielding the puzzles in play as unsolved.
+    """
+    if (config is None):
+        config = SolverConfig()
+    rng = numpy.random.default_rng(numpy.random.SeedSequence(config.seed))
+    ga = None
+    queue = iter(puzzles)
+    exhausted = False
+    while (True):
+        # Fill the free slots from the stream.
+        while (not exhausted and (ga is None or len(ga.free_slots()) > 0)):
+            try:
+                name, given = next(queue)
+            except StopIteration:
+                exhausted = True
+                break
+            start = time.time()
+            try:
+                if (config.propagate):
+                    given = given.propagate()
+                if (given.is_solved()):
+                    yield name, SolverResult.settled(given, start)
+                    continue
+                if (ga is None):
+                    ga = MultiPuzzleGA(width, given.Nd, config, rng)
+                if (given.Nd != ga.Nd):
+                    yield name, solve_genetic(given, config, stop=stop)
+                    continue
+                ga.load(int(ga.free_slots()[0]), name, given)
+            except ValueError as e:
+                yield name, SolverResult.settled(None, start, str(e))
+
+        if (ga is None or not numpy.any(ga.active)):
+            return
+
+        # Retire the puzzles that are solved or out of generations, then evolve the rest.
+        solved, expired = ga.check()
+        for k in numpy.concatenate((solved, expired)).tolist():
+            yield ga.retire(k)
+        if (stop is not None and stop.is_set()):
+            for k in numpy.flatnonzero(ga.active).tolist():
+                yield ga.retire(k)
+            return
+        ga.evolve()
@@ -0,0 +1,195 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from Sudoku import Observer
+
+
+class PhaseStats(object):
+    """ The time spent in one phase of the solver over a run, and the memory allocated in it. """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.longest = 0.0
+        self.peak = 0  # Sum over the calls of the largest number of bytes allocated on top of what was held when the phase started.
+        self.net = 0  # Bytes still held at the end of the phase, less those held at its start, summed over the calls.
+        return
+
+    def add(self, seconds):
+        self.seconds += seconds
+        self.calls += 1
+        self.longest = max(self.longest, seconds)
+        return
+
+
+class Profiler(Observer):
+    """ Breaks down the time of a genetic algorithm run by phase: setup (propagation and the first seeding), the phases of each generation timed by GeneticAlgorithm.evolve (selection, local_search, crossover, mutation, fitness, seeding), the wrapped observer (e.g. the viewer's redraw), and the rest of the generation loop (picking the fittest candidate and checking for a solution).
+
+    The timers are those of GeneticAlgorithm.timings, so they cost next to nothing. If trace_allocations is set, tracemalloc also records, for every phase, the peak memory it allocates and the memory it keeps, and two snapshots (after the first generation and at the end of the run) give the sites of the solver's own modules that hold the most memory. Tracing allocations slows Python down noticeably, so the times are then best compared with each other rather than with an untraced run. The number of swaps tried by mutation is counted as well.
+
+    At the end of the run, the breakdown is available from report(), and can be printed (print_report), written as JSON (dump) or written as collapsed stacks (write_stacks) for flame graph tools such as flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, observer=None, trace_allocations=True, top=10):
+        self.observer = observer
+        self.trace_allocations = trace_allocations
+        self.top = top
+        self.phases = {}
+        self.generations = 0
+        self.mutations = 0
+        self.mutation_attempts = 0
+        self.elapsed = 0.0
+        self.sites = []
+        self.first = None
+        self.started = time.perf_counter()
+        self.clock = None
+        self.aside = 0.0  # Seconds spent in the observer since clock, which are not part of the generation loop.
+        self.tracing = False
+        self.mark = 0
+        if (self.trace_allocations and not tracemalloc.is_tracing()):
+            tracemalloc.start()
+            self.tracing = True
+        return
+
+    def phase(self, name):
+        if (name not in self.phases):
+            self.phases[name] = PhaseStats()
+        return self.phases[name]
+
+    def probe(self, name):
+        """ Record the memory allocated in a phase that just ended, and start measuring the next one. Set as GeneticAlgorithm.probe. """
+        if (tracemalloc.is_tracing()):
+            current, peak = tracemalloc.get_traced_memory()
+            stats = self.phase(name)
+            stats.peak += max(0, peak - self.mark)
+            stats.net += current - self.mark
+            self.restart_tracing()
+        return
+
+    def restart_tracing(self):
+        """ Start measuring the memory allocated from now on. """
+        tracemalloc.reset_peak()
+        self.mark = tracemalloc.get_traced_memory()[0]
+        return
+
+    def lap(self, name, clock):
+        """ Add the time since clock to a phase that is not timed by the genetic algorithm itself, returning the current time. """
+        now = time.perf_counter()
+        self.phase(name).add(now - clock)
+        self.probe(name)
+        return now
+
+    def on_seeded(self, ga):
+        ga.probe = self.probe
+        if (self.clock is None):
+            self.clock = self.lap("setup", self.started)
+        if (self.observer is not None):
+            now = time.perf_counter()
+            self.observer.on_seeded(ga)
+            self.aside += self.lap("observer", now) - now
+        return
+
+    def on_generation(self, ga, best):
+        # The phases of the evolve() call since the last generation (if any), and what the loop spent around it.
+        now = time.perf_counter()
+        evolved = 0.0
+        for name, seconds in ga.timings.items():
+            self.phase(name).add(seconds)
+            evolved += seconds
+        self.phase("other").add(max(0.0, now - self.clock - evolved - self.aside))
+        self.probe("other")
+        self.mutations += ga.mutations
+        self.mutation_attempts += ga.mutation_attempts
+        self.generations += 1
+
+        if (self.observer is not None):
+            now = time.perf_counter()
+            self.observer.on_generation(ga, best)
+            now = self.lap("observer", now)
+        if (self.first is None and tracemalloc.is_tracing()):
+            self.first = tracemalloc.take_snapshot()
+            now = time.perf_counter()  # Leave the snapshot out of the timings.
+            self.restart_tracing()
+        self.clock = now
+        self.aside = 0.0
+        return
+
+    def on_finished(self, result):
+        if (self.clock is None):
+            # The run did not go through the genetic algorithm (e.g. the exact backend, or a puzzle solved by propagation).
+            self.lap("setup", self.started)
+        self.elapsed = time.perf_counter() - self.started
+        if (tracemalloc.is_tracing()):
+            last = tracemalloc.take_snapshot()
+            filters = [tracemalloc.Filter(True, os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py")), tracemalloc.Filter(False, __file__)]  # Only the solver's own modules (Sudoku.py, kernels.py, ...), not those of the standard library.
+            last = last.filter_traces(filters)
+            if (self.first is not None):
+                statistics = last.compare_to(self.first.filter_traces(filters), "lineno")
+            else:
+                statistics = last.statistics("lineno")
+            self.sites = [{"site": "%s:%d" % (os.path.basename(s.traceback[0].filename), s.traceback[0].lineno),
+                           "size": s.size, "count": s.count,
+                           "size_diff": getattr(s, "size_diff", s.size), "count_diff": getattr(s, "count_diff", s.count)}
+                          for s in statistics[0:self.top]]
+            if (self.tracing):
+                tracemalloc.stop()
+                self.tracing = False
+        if (self.observer is not None):
+            self.observer.on_finished(result)
+        return
+
+    def report(self):
+        """ The breakdown of the run as a dict, with the phases in decreasing order of time. """
+        total = sum(stats.seconds for stats in self.phases.values())
+        phases = {}
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].seconds):
+            if (stats.calls == 0):
+                continue
+            phases[name] = {"seconds": stats.seconds,
+                            "share": stats.seconds/total if total > 0 else 0.0,
+                            "calls": stats.calls,
+                            "mean_ms": 1000*stats.seconds/stats.calls,
+                            "max_ms": 1000*stats.longest,
+                            "peak_kib": stats.peak/1024/stats.calls,
+                            "net_kib": stats.net/1024}
+        return {"elapsed": self.elapsed,
+                "generations": self.generations,
+                "phases": phases,
+                "mutations": self.mutations,
+                "mutation_attempts": self.mutation_attempts,
+                "attempts_per_mutation": self.mutation_attempts/self.mutations if self.mutations > 0 else None,
+                "traced_allocations": self.trace_allocations,
+                "allocation_sites": self.sites}
+
+    def print_report(self, out=sys.stderr):
+        report = self.report()
+        print("Profile: %.3f sec, %d generations" % (report["elapsed"], report["generations"]), file=out)
+        print("%-14s %9s %7s %8s %9s %9s %10s %10s" % ("phase", "total s", "share", "calls", "mean ms", "max ms", "peak KiB", "net KiB"), file=out)
+        for name, phase in report["phases"].items():
+            print("%-14s %9.3f %6.1f%% %8d %9.3f %9.3f %10.1f %10.1f" % (
+                name, phase["seconds"], 100*phase["share"], phase["calls"], phase["mean_ms"], phase["max_ms"], phase["peak_kib"], phase["net_kib"]), file=out)
+        if (report["attempts_per_mutation"] is not None):
+            print("Mutation: %d swaps in %d attempts (%.2f attempts per swap)" % (report["mutations"], report["mutation_attempts"], report["attempts_per_mutation"]), file=out)
+        if (len(report["allocation_sites"]) > 0):
+            print("Memory held at the end of the run, by allocation site (change since the first generation):", file=out)
+            for site in report["allocation_sites"]:
+                print("  %-40s %10.1f KiB %8d blocks (%+.1f KiB, %+d blocks)" % (
+                    site["site"], site["size"]/1024, site["count"], site["size_diff"]/1024, site["count_diff"]), file=out)
+        return
+
+    def dump(self, path):
+        """ Write the report as JSON. """
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return
+
+    def write_stacks(self, path):
+        """ Write the time of each phase in the collapsed stack format of flame graph tools: one "solve;generation;phase microseconds" line per phase. """
+        with open(path, "w") as f:
+            for name, stats in sorted(self.phases.items()):
+                stack = "solve;%s" % name if name == "setup" else "solve;generation;%s" % name
+                f.write("%s %d\n" % (stack, int(round(1e6*stats.seconds))))
+        return
@@ -0,0 +1,162 @@
+import os
+import warnings
+
+import numpy
+
+SYMBOLS = "123456789ABCDEFGHIJKLMNOP"  # Values 1 to 25 in the one-puzzle-per-line format.
+BLANKS = ".0"
+
+# The value of each byte in the one-puzzle-per-line format (0 for a blank cell, 255 for a byte that is not a symbol).
+_VALUES = numpy.full(256, 255, dtype=numpy.uint8)
+for _value, _symbol in enumerate(SYMBOLS, 1):
+    _VALUES[ord(_symbol)] = _value
+    _VALUES[ord(_symbol.lower())] = _value
+for _symbol in BLANKS:
+    _VALUES[ord(_symbol)] = 0
+
+# A puzzle bank is this 32 byte header followed by count records of Nd*Nd bytes, one per cell (0 for a blank cell), row by row.
+BANK_MAGIC = b"SUDOKUBK"
+BANK_VERSION = 1
+BANK_HEADER = numpy.dtype([("magic", "S8"), ("version", "<u4"), ("box", "<u4"), ("count", "<u8"), ("reserved", "V8")])
+
+
+def parse_instance(text):
+    """ Parse a puzzle in the format of the instance files: a line holding the box size, a line that is ignored, then one row per line with the values separated by whitespace and -1 for a blank cell. The rows are parsed by NumPy in one pass rather than value by value.
+
+    Returns the box size and the (Nd, Nd) uint8 array of values, with 0 for blank cells.
+    """
+    lines = text.split("\n", 2)
+    if (len(lines) < 2 or not lines[0].strip().isdigit()):
+        raise ValueError("A puzzle must start with a line holding its box size.")
+    box = int(lines[0])
+    Nd = box*box
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)  # Raised when the text cannot be read to its end, which the size check below reports.
+        values = numpy.fromstring(lines[2] if len(lines) > 2 else "", dtype=numpy.int64, sep=" ")
+    if (len(values) != Nd*Nd):
+        raise ValueError("Expected %d values for box size %d, got %d." % (Nd*Nd, box, len(values)))
+    if (numpy.any(values < -1) or numpy.any(values > Nd)):
+        raise ValueError("Values of a %d x %d puzzle must be -1 (blank) or 1 to %d." % (Nd, Nd, Nd))
+    return box, numpy.where(values < 0, 0, values).astype(numpy.uint8).reshape(Nd, Nd)
+
+
+def parse_lines(lines):
+    """ Parse many puzzles written one per line (the 81-character format of the common 9x9 datasets, with '.' or '0' for a blank cell and the letters A-P for the values 10 to 25) in one pass: the lines are joined into a single byte array and mapped to values through a lookup table. If a line has comma-separated fields (as in "puzzle,solution" CSV files), only the first one is used. All the puzzles must have the same size.
+
+    Returns the (count, Nd, Nd) uint8 array of values, with 0 for blank cells.
+    """
+    fields = [line.split(",", 1)[0].strip() for line in lines]
+    if (len(fields) == 0):
+        return numpy.zeros((0, 0, 0), dtype=numpy.uint8)
+    size = len(fields[0])
+    Nd = int(round(size ** 0.5))
+    if (Nd*Nd != size or int(round(Nd ** 0.5)) ** 2 != Nd):
+        raise ValueError("A puzzle line must hold Nd*Nd cells for a square Nd, got %d characters." % size)
+    text = "".join(fields).encode("latin-1", "replace")
+    if (len(text) != size*len(fields)):
+        raise ValueError("All the puzzles must have %d cells." % size)
+
+    values = _VALUES[numpy.frombuffer(text, dtype=numpy.uint8)]
+    invalid = numpy.flatnonzero(values > Nd)
+    if (len(invalid) > 0):
+        raise ValueError("Invalid symbol '%s' for a %d x %d puzzle." % (chr(text[invalid[0]]), Nd, Nd))
+    return values.reshape(len(fields), Nd, Nd)
+
+
+def _header(box, count):
+    header = numpy.zeros(1, dtype=BANK_HEADER)
+    header["magic"] = BANK_MAGIC
+    header["version"] = BANK_VERSION
+    header["box"] = box
+    header["count"] = count
+    return header
+
+
+def write_bank(path, puzzles, box=None, block=4096):
+    """ Write puzzles (an iterable of (Nd, Nd) arrays, with 0 for blank cells) to a puzzle bank file, streaming them in blocks of block puzzles so that inputs of any size can be packed in bounded memory. The box size defaults to that of the first puzzle; all the puzzles must have the same size. Returns the number of puzzles written.
+
+    The bank is written to a temporary file next to path, which only replaces path once it is complete, so that a failure part way through never leaves a bank behind that looks valid.
+    """
+    count = 0
+    Nd = None if box is None else box*box
+    temporary = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        with open(temporary, "wb") as f:
+            _header(0, 0).tofile(f)
+            records = []
+            for values in puzzles:
+                values = numpy.asarray(values)
+                if (Nd is None):
+                    Nd = len(values)
+                    box = int(round(Nd ** 0.5))
+                if (values.shape != (Nd, Nd)):
+                    raise ValueError("Expected a %d x %d grid for box size %d, got shape %s." % (Nd, Nd, box, values.shape))
+                records.append(values.astype(numpy.uint8))
+                if (len(records) == block):
+                    numpy.stack(records).tofile(f)
+                    count += len(records)
+                    records = []
+            if (len(records) > 0):
+                numpy.stack(records).tofile(f)
+                count += len(records)
+
+            # Now that the count is known, write the header again.
+            f.seek(0)
+            _header(box or 0, count).tofile(f)
+        os.replace(temporary, path)
+    except BaseException:
+        if (os.path.exists(temporary)):
+            os.remove(temporary)
+        raise
+    return count
+
+
+class PuzzleBank(object):
+    """ A puzzle bank file (see write_bank), memory-mapped read-only. Indexing and slicing return views of the map, so taking puzzles copies nothing and the pages of the file are shared by every process that opens it.
+
+    A bank pickles as its path, and is opened again at most once per process (see open_bank), so that worker processes can be sent (bank, index) references to puzzles rather than the puzzles themselves.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        header = numpy.fromfile(self.path, dtype=BANK_HEADER, count=1)
+        if (len(header) == 0 or header["magic"][0] != BANK_MAGIC):
+            raise ValueError("'%s' is not a puzzle bank." % path)
+        if (header["version"][0] != BANK_VERSION):
+            raise ValueError("Unsupported puzzle bank version %d in '%s'." % (header["version"][0], path))
+        self.box = int(header["box"][0])
+        self.Nd = self.box*self.box
+        count = int(header["count"][0])
+        if (os.path.getsize(self.path) < BANK_HEADER.itemsize + count*self.Nd*self.Nd):
+            raise ValueError("The puzzle bank '%s' is truncated." % path)
+        if (count == 0):
+            self.puzzles = numpy.zeros((0, self.Nd, self.Nd), dtype=numpy.uint8)  # An empty file cannot be mapped.
+        else:
+            self.puzzles = numpy.memmap(self.path, dtype=numpy.uint8, mode="r", offset=BANK_HEADER.itemsize, shape=(count, self.Nd, self.Nd))
+        return
+
+    def __len__(self):
+        return len(self.puzzles)
+
+    def __getitem__(self, index):
+        return self.puzzles[index]
+
+    def __reduce__(self):
+        return (open_bank, (self.path,))
+
+
+_banks = {}  # The banks opened so far by this process, keyed by path.
+
+
+def open_bank(path):
+    """ Open a puzzle bank, reusing the map of this process if the bank is already open. """
+    path = os.path.abspath(path)
+    if (path not in _banks):
+        _banks[path] = PuzzleBank(path)
+    return _banks[path]
+
+
+def is_bank(path):
+    """ Check whether a file is a puzzle bank, from its magic number. """
+    with open(path, "rb") as f:
+        return f.read(len(BANK_MAGIC)) == BANK_MAGIC
@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import concurrent.futures
+import copy
+import json
+import os
+import sys
+import time
+import urllib.parse
+
+from Sudoku import BACKENDS, Deadline, SolverConfig, Sudoku, solve
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+def _solve_requests(requests):
+    """ Solve a micro-batch of requests in a worker process, one after the other. Each request is a (text, config, expires) triple, with the puzzle in the format of the instance files and the absolute time at which its deadline expires. Returns one response (a dict) per request. """
+    responses = []
+    for text, config, expires in requests:
+        start = time.time()
+        response = {}
+        deadline = Deadline(expires - start)
+        if (deadline.is_set()):
+            # The deadline passed while the request was waiting for this batch.
+            response = {"solved": False, "timed_out": True}
+        else:
+            try:
+                s = Sudoku()
+                s.loads(text)
+                result = solve(s.given, config, stop=deadline)
+                response["solved"] = result.solved
+                response["solution"] = result.solution.values.tolist() if result.solved else None
+                response["fitness"] = result.fitness
+                response["generations"] = result.generations
+                response["restarts"] = result.restarts
+                response["timed_out"] = not result.solved and deadline.is_set()
+                if (hasattr(result, "error")):
+                    response["error"] = result.error
+            except ValueError as e:
+                response = {"solved": False, "error": str(e)}
+        response["elapsed"] = time.time() - start
+        responses.append(response)
+    return responses
+
+
+class SolverService(object):
+    """ A local solver service over HTTP (on localhost or a Unix socket), so that other programs can solve puzzles without paying the start-up cost of the interpreter for each one.
+
+    POST /solve takes a puzzle in the format of the instance files as its body, with optional query parameters deadline (seconds), backend, seed, population and generations, and answers with a JSON object. GET /health reports the state of the queue. Requests are queued and sent to a pool of worker processes, one request per idle worker. Only when every worker is busy are they gathered in micro-batches, for at most batch_window seconds, of up to batch_size requests and at most the worker's share of the queue (the queued requests divided by the number of workers, rounded up), so that no worker is left idle while another works through a batch. At most one batch per worker is in flight, so that the rest wait in the queue. Every request has a deadline (default_deadline unless given): requests still queued when it passes are answered without being solved, and runs in flight stop at their next generation. If the pool breaks (e.g. a worker process dies), the requests in its batches are answered with an error and a new pool takes the following ones.
+    """
+
+    def __init__(self, workers=None, batch_size=8, batch_window=0.005, default_deadline=30.0, config=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.default_deadline = default_deadline
+        self.config = config if config is not None else SolverConfig(backend="exact")
+        self.queue = None
+        self.pool = None
+        self.slots = None
+        self.batcher = None
+        self.in_flight = 0
+        self.stats = {"requests": 0, "solved": 0, "timed_out": 0, "errors": 0}
+        return
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        """ Start the workers and listen on a Unix socket if path is given, or on host and port otherwise. Returns the asyncio server. """
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.workers)
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        self.batcher = asyncio.ensure_future(self.batch())
+        if (path is not None):
+            return await asyncio.start_unix_server(self.handle, path=path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        self.batcher.cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        return
+
+    async def submit(self, text, config, deadline):
+        """ Queue a puzzle and wait for its response. """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, config, time.time() + deadline, future))
+        return await future
+
+    async def batch(self):
+        """ Send the queued requests to the workers: one at a time while some worker is idle, and in micro-batches once they are all busy. """
+        loop = asyncio.get_running_loop()
+        while (True):
+            await self.slots.acquire()
+            batch = [await self.queue.get()]
+
+            # With every other worker busy, gather a micro-batch, but no more than the worker's share of the queue, so that the requests behind it are spread over the workers as they free up.
+            if (self.slots.locked()):
+                closes = loop.time() + self.batch_window
+                while (len(batch) < min(self.batch_size, -(-(len(batch) + self.queue.qsize()) // self.workers))):
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), max(0.0, closes - loop.time())))
+                    except asyncio.TimeoutError:
+                        break
+
+            # Answer the requests that expired in the queue (or whose client went away) without solving them.
+            now = time.time()
+            live = []
+            for request in batch:
+                if (request[3].done()):
+                    continue
+                if (request[2] <= now):
+                    request[3].set_result({"solved": False, "timed_out": True, "elapsed": 0.0})
+                else:
+                    live.append(request)
+            if (len(live) == 0):
+                self.slots.release()
+                continue
+
+            self.in_flight += len(live)
+            pool = self.pool
+            try:
+                work = loop.run_in_executor(pool, _solve_requests, [(text, config, expires) for text, config, expires, future in live])
+            except Exception as e:
+                # The pool cannot take work any more (e.g. one of its workers died): answer the batch with the error and start a new pool, rather than leave every request waiting.
+                self.finish(None, live, pool, e)
+                continue
+            work.add_done_callback(lambda done, live=live, pool=pool: self.finish(done, live, pool))
+
+    def finish(self, done, live, pool, error=None):
+        """ Answer the requests of a batch sent to pool with its responses, or with the error it failed with (that of the future done, or error if it could not be sent at all), and free its slot. A broken pool is replaced. """
+        self.in_flight -= len(live)
+        self.slots.release()
+        if (error is None and done.exception() is not None):
+            error = done.exception()
+        if (done is None or isinstance(error, concurrent.futures.BrokenExecutor)):
+            self.restart_pool(pool)
+        for i, (text, config, expires, future) in enumerate(live):
+            if (future.done()):
+                continue
+            if (error is not None):
+                future.set_result({"solved": False, "error": str(error) or type(error).__name__})
+            else:
+                future.set_result(done.result()[i])
+        return
+
+    def restart_pool(self, pool):
+        """ Replace the pool of workers if it is still the given (broken) one, so that the batches sent to it after it broke do not each start a new one. """
+        if (self.pool is pool):
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        return
+
+    def request_config(self, query):
+        """ The SolverConfig of a request, from the service's defaults and the query parameters. """
+        config = copy.copy(self.config)
+        if ("backend" in query):
+            if (query["backend"] not in BACKENDS):
+                raise ValueError("Unknown solver backend '%s'." % query["backend"])
+            config.backend = query["backend"]
+        if ("seed" in query):
+            config.seed = int(query["seed"])
+        if ("population" in query):
+            config.Nc = int(query["population"])
+            config.Ne = int(0.1*config.Nc)
+        if ("generations" in query):
+            config.Ng = int(query["generations"])
+        return config
+
+    async def handle(self, reader, writer):
+        """ Serve one HTTP request on a connection. """
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while (True):
+                line = (await reader.readline()).decode("latin-1").strip()
+                if (line == ""):
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            if (len(request_line) < 2):
+                status, response = 400, {"error": "Malformed request."}
+            else:
+                method = request_line[0]
+                url = urllib.parse.urlsplit(request_line[1])
+                query = dict(urllib.parse.parse_qsl(url.query))
+                status, response = await self.route(method, url.path, query, body.decode("utf-8"))
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            status, response = 400, {"error": str(e)}
+
+        payload = json.dumps(response).encode("utf-8")
+        writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: close\r\n\r\n" % (status, REASONS[status].encode("latin-1"), len(payload)))
+        writer.write(payload)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+        return
+
+    async def route(self, method, path, query, body):
+        if (path == "/health"):
+            return 200, dict(self.stats, queued=self.queue.qsize(), in_flight=self.in_flight, workers=self.workers)
+        if (path != "/solve"):
+            return 404, {"error": "Unknown path '%s'." % path}
+        if (method != "POST"):
+            return 405, {"error": "Use POST to solve a puzzle."}
+
+        deadline = float(query.get("deadline", self.default_deadline))
+        config = self.request_config(query)
+        self.stats["requests"] += 1
+        response = await self.submit(body, config, deadline)
+        if (response.get("solved")):
+            self.stats["solved"] += 1
+        if (response.get("timed_out")):
+            self.stats["timed_out"] += 1
+        if ("error" in response):
+            self.stats["errors"] += 1
+            return 400, response
+        return 200, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the solver over HTTP, on localhost or on a Unix socket.")
+    parser.add_argument("--host", default="127.0.0.1", help="the address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="the port to listen on")
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket instead")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (one per core by default)")
+    parser.add_argument("--batch-size", type=int, default=8, help="maximum number of requests sent to a worker at a time, once all the workers are busy")
+    parser.add_argument("--batch-window", type=float, default=0.005, help="seconds to wait for more requests before sending a batch")
+    parser.add_argument("--deadline", type=float, default=30.0, help="default deadline of a request in seconds")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="exact", help="the default solver backend")
+    args = parser.parse_args()
+
+    async def serve():
+        service = SolverService(args.workers, args.batch_size, args.batch_window, args.deadline, SolverConfig(backend=args.backend))
+        server = await service.start(args.host, args.port, args.unix)
+        print("Listening on %s." % (args.unix or "http://%s:%d" % (args.host, args.port)), file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import numpy
+import pytest
+
+import kernels
+from Sudoku import Board, PopulationBuffer, evaluate_fitness
+
+# The kernels checked against the NumPy reference ones: the compiled kernels when Numba is installed, and their loops run as plain Python otherwise.
+if (kernels.numba is not None):
+    LOOPS = (kernels.move_cells_compiled, kernels.unit_fitness_compiled, kernels.odd_cycles_compiled)
+else:
+    LOOPS = (kernels._move_cells_loops, kernels._unit_fitness_loops, kernels._odd_cycles_loops)
+
+
+def random_buffers(rng, Nc, Nd):
+    """ Two identical PopulationBuffers of Nc random candidates whose rows are permutations of [1, Nd], with their counts. """
+    buffers = [PopulationBuffer(Nc, Nd), PopulationBuffer(Nc, Nd)]
+    values = numpy.argsort(rng.random((Nc, Nd, Nd)), axis=2).astype(numpy.uint8) + 1
+    fitness, column_counts, block_counts = evaluate_fitness(values, counts=True)
+    for buffer in buffers:
+        buffer.values[:] = values
+        buffer.column_counts[:] = column_counts
+        buffer.block_counts[:] = block_counts
+        buffer.column_histogram[:], buffer.column_distinct[:] = kernels.histograms(buffer.column_counts)
+        buffer.block_histogram[:], buffer.block_distinct[:] = kernels.histograms(buffer.block_counts)
+    return buffers
+
+
+def check_move(buffers, blocks, cells, new):
+    """ Move the cells of both buffers with the reference kernel and the loops, and check that they agree with each other and with a fresh evaluation of the new values. """
+    for buffer, kernel in zip(buffers, (kernels.move_cells_reference, LOOPS[0])):
+        kernel(buffer.values, buffer.column_counts, buffer.column_histogram, buffer.column_distinct,
+               buffer.block_counts, buffer.block_histogram, buffer.block_distinct, blocks, cells[0], cells[1], cells[2], new)
+    for name in PopulationBuffer.__slots__:
+        assert numpy.array_equal(getattr(buffers[0], name), getattr(buffers[1], name)), "move_cells differs in %s" % name
+
+    fitness, column_counts, block_counts = evaluate_fitness(buffers[0].values, counts=True)
+    for counts, name in ((column_counts, "column"), (block_counts, "block")):
+        histogram, distinct = kernels.histograms(counts)
+        assert numpy.array_equal(getattr(buffers[0], name + "_counts"), counts)
+        assert numpy.array_equal(getattr(buffers[0], name + "_histogram"), histogram)
+        assert numpy.array_equal(getattr(buffers[0], name + "_distinct"), distinct)
+    return
+
+
+@pytest.mark.parametrize("box", [2, 3, 4, 5])
+def test_kernels_agree(box):
+    rng = numpy.random.default_rng(box)
+    Nd = box*box
+    blocks = Board.of_box(box).blocks
+    for trial in range(0, 50):
+        Nc = 1 + int(rng.integers(8))
+        buffers = random_buffers(rng, Nc, Nd)
+        values = buffers[0].values.copy()
+
+        # Swap two cells of a row in some of the candidates.
+        slots = numpy.arange(Nc)[rng.random(Nc) < 0.7]
+        rows = rng.integers(Nd, size=len(slots))
+        columns1 = rng.integers(Nd, size=len(slots))
+        columns2 = (columns1 + 1 + rng.integers(Nd-1, size=len(slots))) % Nd
+        cells = (numpy.concatenate((slots, slots)), numpy.concatenate((rows, rows)), numpy.concatenate((columns1, columns2)))
+        check_move(buffers, blocks, cells, numpy.concatenate((values[slots, rows, columns2], values[slots, rows, columns1])))
+
+        everyone = numpy.arange(Nc)
+        reference = kernels.unit_fitness_reference(buffers[0].column_distinct, buffers[0].block_distinct, everyone)
+        assert numpy.array_equal(reference, LOOPS[1](buffers[1].column_distinct, buffers[1].block_distinct, everyone))
+        assert numpy.array_equal(reference, evaluate_fitness(buffers[0].values))
+
+        rows1 = buffers[0].values[:, 0, :]
+        rows2 = buffers[0].values[::-1, 1, :]
+        assert numpy.array_equal(kernels.odd_cycles_reference(rows1, rows2), LOOPS[2](rows1, rows2))
+
+        # Set many distinct cells of every candidate to random values, so that several of them fall in the same column or block (the rows are no longer permutations afterwards).
+        flat = numpy.flatnonzero(rng.random(Nc*Nd*Nd) < 0.3)
+        cells = numpy.unravel_index(flat, (Nc, Nd, Nd))
+        check_move(buffers, blocks, cells, (1 + rng.integers(Nd, size=len(flat))).astype(numpy.uint8))
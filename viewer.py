@@ -0,0 +1,135 @@
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+import tkinter as tk
+import time
+
+from Sudoku import Observer
+
+
+class GeneticAlgorithmViewer(Observer):
+    """ A Tkinter window that follows the progress of a solver run.
+
+    Redrawing the grid and the Matplotlib figure is far more expensive than a generation of the genetic algorithm, so the window is redrawn at most max_redraws_per_second times per second. Every generation is still recorded in the fitness plot.
+    """
+
+    def __init__(self, max_redraws_per_second=10):
+        self.min_interval = 1.0/max_redraws_per_second if max_redraws_per_second > 0 else 0.0
+        self.last_redraw = None
+        self.generation_list = []
+        self.fitness_list = []
+
+        self.root = tk.Tk()
+        self.root.title("Sudoku Solving using Genetic Algorithm")
+
+        # Add a frame to add padding
+        self.frame = tk.Frame(self.root, padx=10, pady=10)
+        self.frame.grid(row=0, column=0, pady=10, padx=10)
+
+        self.generation_label = tk.Label(
+            self.root, text="Generation", font=('Inter', 14, 'bold'))
+        self.generation_label.grid(row=11, column=0, columnspan=30, pady=0)
+
+        self.fitness_label = tk.Label(
+            self.root, text="Fitness", font=('Inter', 14, 'bold'))
+        self.fitness_label.grid(row=12, column=0, columnspan=30, pady=0)
+
+        self.seeding_label = tk.Label(
+            self.root, text="Seeding Complete.", font=('Inter', 14, 'bold'), fg='green')
+        self.seeding_label.grid(row=13, column=0, columnspan=30, pady=0)
+
+        self.solution_label = tk.Label(
+            self.root, text="", font=('Inter', 14, 'bold'), fg='green')
+        self.solution_label.grid(row=14, column=0, columnspan=30, pady=0)
+
+        self.time_label = tk.Label(
+            self.root, text="", font=('Inter', 14, 'bold'), fg='green')
+        self.time_label.grid(row=15, column=0, columnspan=30, pady=0, padx=10)
+
+        # Create a Matplotlib figure and canvas to embed it in the Tkinter window
+        self.fig = Figure(figsize=(5, 4), dpi=100)
+        self.ax = self.fig.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
+        self.canvas_widget = self.canvas.get_tk_widget()
+        self.canvas_widget.grid(row=10, column=0, columnspan=30, pady=10)
+
+        # Create labels for displaying the matrix
+        self.matrix_labels = []
+
+    def update_matplotlib_figure(self, generations, fitness_values):
+        if generations is None or fitness_values is None:
+            # Replace this with your dynamic data update logic
+            x = np.linspace(0, 10, 100)
+            y = np.sin(x)
+        else:
+            x = generations
+            y = fitness_values
+
+        self.ax.clear()
+        self.ax.plot(x, y, marker='o', linestyle='-', color='b')
+
+        # Set labels and title
+        self.ax.set_xlabel('Generation')
+        self.ax.set_ylabel('Fitness')
+        self.ax.set_title('Fitness vs Generation')
+
+        self.canvas.draw()
+
+    def display_matrix(self, matrix):
+        matrix_list = matrix.tolist()
+
+        num_rows = len(matrix_list)
+        num_cols = len(matrix_list[0]) if matrix_list else 0
+
+        # Update existing labels or create new labels if necessary
+        for i in range(num_rows):
+            for j in range(num_cols):
+                if len(self.matrix_labels) <= i * num_cols + j:
+                    label = tk.Label(self.root, borderwidth=1, relief="solid",
+                                     width=5, height=2, font=('Inter', 12, 'bold'))
+                    label.grid(row=i, column=j)
+                    self.matrix_labels.append(label)
+                else:
+                    label = self.matrix_labels[i * num_cols + j]
+
+                label.config(text=str(matrix_list[i][j]))
+
+    def redraw(self, best):
+        """ Redraw the grid and the fitness plot. """
+        self.display_matrix(best.values)
+        self.update_matplotlib_figure(self.generation_list, self.fitness_list)
+        self.root.update()
+        self.last_redraw = time.time()
+
+    def on_seeded(self, ga):
+        if (ga.restarts > 0):
+            self.seeding_label.config(
+                text=f"Stagnation detected. Re-seeded... {ga.restarts}th time", fg='red')
+
+    def on_generation(self, ga, best):
+        self.generation_list.append(ga.generation)
+        self.fitness_list.append(best.fitness)
+        self.generation_label.config(text=f"Generation: {ga.generation}")
+        self.fitness_label.config(text=f"Fitness: {best.fitness}")
+
+        if (self.last_redraw is None or time.time() - self.last_redraw >= self.min_interval):
+            self.redraw(best)
+
+    def on_finished(self, result):
+        if (result.solved and result.generations > 0):
+            self.solution_label.config(
+                text=f"Solution found at generation {result.generations - 1}")
+        elif (result.solved):
+            self.solution_label.config(text="Solution found")
+        else:
+            self.solution_label.config(
+                text=f"No Solution till {result.generations} generations", fg='red')
+        self.time_label.config(
+            text=f"Time taken: {round(result.elapsed, 2)} sec")
+        if (result.best is not None):
+            self.redraw(result.best)
+        else:
+            self.root.update()
+
+    def run(self):
+        self.root.mainloop()